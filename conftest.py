@@ -0,0 +1,21 @@
+# the root of the repository is put on sys.path by pytest, so the tests import
+# utils & tools the same way as the scripts (PYTHONPATH=./)
+
+import numpy as np
+import pytest
+
+
+def _gen_random_M_adj(rng, num_star):
+    # the ADs of num_star random stars around the boresight
+    v = rng.normal(size=(num_star, 3)) * 0.05 + np.array([0, 0, 1])
+    v /= np.linalg.norm(v, axis=1, keepdims=True)
+    M_adj = np.degrees(np.arccos(np.clip(np.matmul(v, v.T), -1, 1)))
+    np.fill_diagonal(M_adj, 0)
+    return M_adj
+
+
+# the function that generates the adjacency matrix of random stars, shared by the
+# tests, e.g., gen_random_M_adj(rng, num_star)
+@pytest.fixture
+def gen_random_M_adj():
+    return _gen_random_M_adj
@@ -1,18 +1,18 @@
 # -*- coding: utf-8 -*-
 """
-This code is used for parameter selection, especially for selecting the best radius 
-of neighboring circle R. The RightAscension & Declination of the optical axis is 
-randomly selected. The R_max is calculated and annalysed. 
+This code is used for parameter selection, especially for selecting the best radius
+of neighboring circle R. The RightAscension & Declination of the optical axis is
+randomly selected. The R_max is calculated and annalysed.
 
-The project model of one star is described in 'project_1s' function.
+The project model of the stars is described in 'project_stars' function.
 
-According to the project model, the neighbor star whose AD(angular distance) with 
+According to the project model, the neighbor star whose AD(angular distance) with
 optical axis is less than min(FOV_x,FOV_y)/2 is project in the image.
 
-Note that stars whose AD is larger or equal than min(FOV_x,FOV_y)/2 still has 
-possibility to fall in the image. However, almost all algorithms choose stars 
-by a circle centering the main star. The circle's radius is less or euqal than 
-min(FOV_x,FOV_y)/2. So stars whose AD is larger or equal than min(FOV_x,FOV_y)/2 
+Note that stars whose AD is larger or equal than min(FOV_x,FOV_y)/2 still has
+possibility to fall in the image. However, almost all algorithms choose stars
+by a circle centering the main star. The circle's radius is less or euqal than
+min(FOV_x,FOV_y)/2. So stars whose AD is larger or equal than min(FOV_x,FOV_y)/2
 actually have no use.
 
 Written in 2020.02.10, revised in 2022.12.08
@@ -23,10 +23,13 @@ by Zhiyuan You
 import math
 import matplotlib.pyplot as plt
 import numpy as np
+import os
 
 from easydict import EasyDict
 
-from utils.simulator_helper import project_1s
+from utils.common.cache_helper import check_cached, gen_stage_manifests
+from utils.common.sky_index_helper import SkyIndex
+from utils.simulator_helper import load_catalog, project_stars
 
 
 # CN: CatalogNumber
@@ -47,7 +50,7 @@ deg2rad = math.pi / 180
 rad2deg = 180 / math.pi
 
 
-def simulate_one(lines, para):
+def simulate_one(catalog, sky_index, para):
     # randomly select optical axis
     RA_oa = (
         np.random.random() * (para.RA_range[1] - para.RA_range[0]) + para.RA_range[0]
@@ -60,39 +63,30 @@ def simulate_one(lines, para):
     vx_oa = np.cos(RA_oa) * np.cos(Dec_oa)
     vy_oa = np.sin(RA_oa) * np.cos(Dec_oa)
     vz_oa = np.sin(Dec_oa)
+    v_oa = np.array([vx_oa, vy_oa, vz_oa])
 
-    dis_min = float("inf")
-    for i_s in range(len(lines)):
-        data_s = lines[i_s].strip().split()
-        assert len(data_s) == 4
-
-        # generate unit vector for calculating angular distance
-        _, _, RA_s, Dec_s = data_s
-        RA_s, Dec_s = float(RA_s), float(Dec_s)
-        vx_s = np.cos(RA_s) * np.cos(Dec_s)
-        vy_s = np.sin(RA_s) * np.cos(Dec_s)
-        vz_s = np.sin(Dec_s)
-
-        # AD_s_oa: the angular distance between star & optical axis
-        cos = vx_s * vx_oa + vy_s * vy_oa + vz_s * vz_oa
-        AD_s_oa = np.arccos(np.clip(cos, -1, 1)) * rad2deg
-
-        # x_s, y_s: the project coordinate of star
-        x_s, y_s = project_1s(
-            Dec_oa, RA_oa, Dec_s, RA_s, para.N_x, para.N_y, para.FOV_x, para.FOV_y
-        )
-        # dis_s: the distance between star and image center
-        dis_s = np.sqrt(x_s**2 + y_s**2)
-
-        if AD_s_oa <= min(para.FOV_x, para.FOV_y) / 2:
-            if abs(x_s) > para.N_x / 2 or abs(y_s) > para.N_y / 2:
-                print("Error with your projection model! ")
-            # find the main star
-            if dis_s < dis_min:
-                # print(dis_s)
-                dis_min = dis_s
-                x_s_min = x_s
-                y_s_min = y_s
+    # the stars whose AD with optical axis is less than min(FOV_x,FOV_y)/2
+    i_s_list = sky_index.query(v_oa, min(para.FOV_x, para.FOV_y) / 2)
+    v_s = catalog["v_inertial"][i_s_list]
+
+    # AD_s_oa: the angular distance between star & optical axis
+    cos = np.matmul(v_s, v_oa)
+    AD_s_oa = np.arccos(np.clip(cos, -1, 1)) * rad2deg
+    v_s = v_s[AD_s_oa <= min(para.FOV_x, para.FOV_y) / 2]
+
+    # x_s, y_s: the project coordinate of star
+    x_s, y_s = project_stars(
+        Dec_oa, RA_oa, v_s, para.N_x, para.N_y, para.FOV_x, para.FOV_y
+    )
+    if np.any((np.abs(x_s) > para.N_x / 2) | (np.abs(y_s) > para.N_y / 2)):
+        print("Error with your projection model! ")
+
+    # find the main star
+    # dis_s: the distance between star and image center
+    dis_s = np.sqrt(x_s**2 + y_s**2)
+    i_s_min = np.argmin(dis_s)
+    x_s_min = x_s[i_s_min]
+    y_s_min = y_s[i_s_min]
 
     # calculate the coordinate of the tangent point
     i_min = np.argmin(
@@ -155,15 +149,18 @@ if __name__ == "__main__":
     para.Dec_range = [-math.pi / 2, math.pi / 2]
 
     # read the SAO database
-    f_sao_name = f"./database/sao_VM_thre{para.VM_thre}.txt"
-    with open(f_sao_name) as fr:
-        lines = fr.readlines()
+    manifest = gen_stage_manifests(para, "catalog")["catalog"]
+    check_cached(manifest)
+    f_sao_name = os.path.join(manifest["dir"], "sao_VM_sorted.npz")
+    catalog = load_catalog(f_sao_name, para.VM_thre)
+    # the index for finding the stars in min(FOV_x,FOV_y)/2
+    sky_index = SkyIndex(catalog["v_inertial"], zone_AD=min(para.FOV_x, para.FOV_y) / 2)
 
     # save the R_max
     R_max_list = []
     for i_simu in range(para.num_simu):
         print(f"Simulating: {i_simu + 1}")
-        R_max = simulate_one(lines, para)
+        R_max = simulate_one(catalog, sky_index, para)
         R_max_list.append(R_max)
 
     # draw the results
@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 """
-This code is used to select the best parameter epsilon_mst. 
+This code is used to select the best parameter epsilon_mst.
 
 Written in 2020.02.17, revised in 2022.12.08
 by Zhiyuan You
@@ -12,36 +12,39 @@ import math
 import matplotlib.pyplot as plt
 import numpy as np
 import os
-import random
 
 from easydict import EasyDict
 
+from utils.common.cache_helper import check_cached, gen_stage_manifests
 from utils.search.select_R_AD_helper import select_R_AD
 from utils.search.graph_helper import gen_graph
 from utils.common.mst_helper import gen_mst
-from utils.noise_helper import add_noise
+from utils.common.star_frame_helper import read_star_frame
+from utils.noise_helper import add_noise, gen_trial_rng
 
 
 deg2rad = math.pi / 180
 rad2deg = 180 / math.pi
 
 
-def simulate_one(file_names, para):
+# i_simu: the index of the simulation, every star image of every simulation is
+# a trial with its own random number generator, see gen_trial_rng
+def simulate_one(file_names, para, i_simu):
     error_AD_sum_mst_list = []
-    for f_read_name in file_names:
-        with open(f_read_name) as fr:
-            lines = fr.readlines()
+    for i_file, f_read_name in enumerate(file_names):
+        rng = gen_trial_rng(para.seed, i_simu * len(file_names) + i_file)
+        frame = read_star_frame(f_read_name)
 
         # generate mst
-        lines = select_R_AD(lines, para)
-        graph = gen_graph(lines, para)
+        frame = select_R_AD(frame, para)
+        graph = gen_graph(frame, para)
         graph, _ = gen_mst(graph)
         AD_sum_mst = graph["AD_sum_mst"]
 
         # generate noise AS_sum_mst
-        lines_noise = add_one_noise(lines, args, para)
-        lines_noise = select_R_AD(lines_noise, para)
-        graph_noise = gen_graph(lines_noise, para)
+        frame_noise = add_one_noise(frame, args, para, rng)
+        frame_noise = select_R_AD(frame_noise, para)
+        graph_noise = gen_graph(frame_noise, para)
         graph_noise, _ = gen_mst(graph_noise)
         AD_sum_mst_noise = graph_noise["AD_sum_mst"]
 
@@ -52,9 +55,9 @@ def simulate_one(file_names, para):
     return error_AD_sum_mst_list
 
 
-def add_one_noise(lines, args, para):
+def add_one_noise(frame, args, para, rng):
     args_one = copy.deepcopy(args)
-    noise_type = random.choice([0, 1, 2])
+    noise_type = rng.choice([0, 1, 2])
     if noise_type == 0:
         args_one.num_lost = 0
         args_one.num_false = 0
@@ -62,12 +65,12 @@ def add_one_noise(lines, args, para):
         args_one.std_position = 0
         args_one.num_false = 0
     elif noise_type == 2:
-        args.std_position = 0
-        args.num_lost = 0
+        args_one.std_position = 0
+        args_one.num_lost = 0
     else:
         raise ValueError
-    lines_noise = add_noise(lines, args, para)
-    return lines_noise
+    frame_noise = add_noise(frame, args_one, para, rng)
+    return frame_noise
 
 
 if __name__ == "__main__":
@@ -80,6 +83,12 @@ if __name__ == "__main__":
     para.N_x = 1024  # resolution
     para.N_y = 1024
     para.num_simu = 3
+    # the random seed of the noise, see simulate_one
+    para.seed = 0
+
+    # the parameters of the star images, which locate them, see cache_helper
+    para.VM_thre = 6.0
+    para.AD_2s_thre = 0.19
 
     # noise
     args = EasyDict({})
@@ -88,13 +97,15 @@ if __name__ == "__main__":
     args.num_false = 1
 
     # ergodic every navigation star
-    database_txt_dir = "./database/txt_star_image"
-    file_names = glob.glob(os.path.join(database_txt_dir, "*.txt"))
+    manifest = gen_stage_manifests(para, "star_image")["star_image"]
+    check_cached(manifest)
+    database_txt_dir = os.path.join(manifest["dir"], "txt_star_image")
+    file_names = sorted(glob.glob(os.path.join(database_txt_dir, "*.txt")))
 
     error_AD_sum_mst_list = []
     for i_simu in range(para.num_simu):
         print(f"Simulating: {i_simu + 1}")
-        error_AD_sum_mst_list += simulate_one(file_names, para)
+        error_AD_sum_mst_list += simulate_one(file_names, para, i_simu)
 
     error_max = max(error_AD_sum_mst_list)
     num_total = len(error_AD_sum_mst_list)
@@ -111,9 +122,10 @@ if __name__ == "__main__":
     plt.xticks(fontsize=14)
     plt.yticks(fontsize=14)
     plt.ylim(-3, 103)
-    plt.xlabel("$\Delta^x$/°", fontsize=14)
+    plt.xlabel(r"$\Delta^x$/°", fontsize=14)
     plt.ylabel("$Proportion$/%", fontsize=14)
     plt.title(
-        "Proportion of simulations satisfying $\Delta$ < $\Delta^x$ with various $\Delta^x$",
+        r"Proportion of simulations satisfying $\Delta$ < $\Delta^x$ with various "
+        r"$\Delta^x$",
     )
     plt.show()
@@ -0,0 +1,3 @@
+export PYTHONPATH=./:$PYTHONPATH
+
+python -u ./tools/benchmark.py "$@"
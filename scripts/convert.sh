@@ -1,3 +0,0 @@
-export PYTHONPATH=./:$PYTHONPATH
-
-python -u ./tools/convert_SAO_to_txt.py
@@ -1,3 +1,3 @@
 export PYTHONPATH=./:$PYTHONPATH
 
-python -u ./tools/gen_database.py
+python -u ./tools/gen_database.py --workers ${1:-1}
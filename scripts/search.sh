@@ -1,3 +1,3 @@
 export PYTHONPATH=./:$PYTHONPATH
 
-python -u ./tools/search.py --std_position $1 --num_lost $2 --num_false $3
+python -u ./tools/search.py --std_position $1 --num_lost $2 --num_false $3 --workers ${4:-1}
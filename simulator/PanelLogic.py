@@ -21,6 +21,7 @@ class PanelLogic(QWidget, Ui_Panel):
         self.pic_save_dir = ""
         self.txt_save_dir = ""
         self.database_star_dir = "./database"
+        self.f_all_star_path = os.path.join(self.database_star_dir, "sao")
         self.btn_cam_savedir.clicked.connect(self.Click_set_savedir)
         self.btn_take_pic.clicked.connect(self.Click_take_img)
         self.btn_VM_select.clicked.connect(self.Click_select_VM)
@@ -72,12 +73,12 @@ class PanelLogic(QWidget, Ui_Panel):
         Color = [self.Color_back, self.Color_star]
         Save_dir = [self.pic_save_dir, self.txt_save_dir]
 
-        # 判断此时是否已经进行了亮度筛选，能否星图仿真
-        f_star_path = os.path.join(
-            self.database_star_dir, "sao_VM_thre" + str(VM_thre) + ".txt"
+        # 判断此时是否已经进行了亮度筛选，且星表是最新的，能否星图仿真
+        f_star_path = self.obj_Stellar_Simulation.find_catalog(
+            self.f_all_star_path, self.database_star_dir
         )
-        if not os.path.exists(f_star_path):
-            self.view_result.append("星图仿真失败，请先进行亮度阈值为" + str(VM_thre) + "时的亮度筛选！")
+        if f_star_path is None:
+            self.view_result.append("星图仿真失败，请先进行亮度筛选！")
         else:
             self.obj_Stellar_Simulation.img_simu_file(
                 f_star_path, RDR, FOV, N, VM_thre, R, Color, Save_dir
@@ -86,16 +87,13 @@ class PanelLogic(QWidget, Ui_Panel):
         self.view_result.moveCursor(QtGui.QTextCursor.End)
 
     def Click_select_VM(self):
-        f_all_star_path = os.path.join(self.database_star_dir, "sao")
         VM_thre = round(self.SpinBox_star_VM.value(), 1)  # 由于该参数涉及到文件名，故用round去除一些数据误差
-        f_star_path = os.path.join(
-            self.database_star_dir, "sao_VM_thre" + str(VM_thre) + ".txt"
+        num_star = self.obj_Stellar_Simulation.select_VM(
+            self.f_all_star_path, self.database_star_dir, VM_thre
+        )
+        self.view_result.append(
+            f"亮度阈值为{VM_thre}时的亮度筛选完成，共{num_star}颗恒星！"
         )
-        if not os.path.exists(f_star_path):
-            self.obj_Stellar_Simulation.select_VM(f_all_star_path, f_star_path, VM_thre)
-            self.view_result.append("亮度阈值为" + str(VM_thre) + "时的亮度筛选完成！")
-        else:
-            self.view_result.append("亮度阈值为" + str(VM_thre) + "时的亮度筛选已进行过，无需重复进行！")
         self.view_result.moveCursor(QtGui.QTextCursor.End)
 
     def Click_random_simu(self):
@@ -114,12 +112,12 @@ class PanelLogic(QWidget, Ui_Panel):
         Color = [self.Color_back, self.Color_star]
         Save_dir = [self.pic_save_dir, self.txt_save_dir]
 
-        # 判断此时是否已经进行了亮度筛选，能否星图仿真
-        f_star_path = os.path.join(
-            self.database_star_dir, "sao_VM_thre" + str(VM_thre) + ".txt"
+        # 判断此时是否已经进行了亮度筛选，且星表是最新的，能否星图仿真
+        f_star_path = self.obj_Stellar_Simulation.find_catalog(
+            self.f_all_star_path, self.database_star_dir
         )
-        if not os.path.exists(f_star_path):
-            self.view_result.append("星图仿真失败，请先进行亮度阈值为" + str(VM_thre) + "时的亮度筛选！")
+        if f_star_path is None:
+            self.view_result.append("星图仿真失败，请先进行亮度筛选！")
         else:
             self.obj_Stellar_Simulation.random_simu(
                 f_star_path, num_simu, FOV, N, VM_thre, R, Color, Save_dir
@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 """
-This code is used to generate simulation star images through RightAscension & 
+This code is used to generate simulation star images through RightAscension &
 Declination of the stars in FOV of CCD.
 
 Revised in 3/25/2020
@@ -14,6 +14,17 @@ import os
 
 from PyQt5 import QtGui, QtCore
 
+from utils.common.cache_helper import (
+    clear_stage,
+    gen_stage_manifests,
+    is_cached,
+    save_manifest,
+    set_current_manifest,
+)
+from utils.common.sky_index_helper import SkyIndex
+from utils.sao_helper import gen_VM_sorted_catalog, read_SAO
+from utils.simulator_helper import load_catalog, project_stars, save_catalog, select_VM
+
 
 # CN: CatalogNumber
 # VM: VisualMagnitude
@@ -44,52 +55,27 @@ Dec_range = [-math.pi / 2, math.pi / 2]
 Roll_range = [0, 2 * math.pi]
 
 
-# the project model of one star
-def project_1s(Dec, RA, Roll, Dec_i, RA_i, N_x, N_y, FOV_x, FOV_y):
+# the project model of the stars, with the roll of the optical axis
+def project_stars_roll(Dec, RA, Roll, v_inertial, N_x, N_y, FOV_x, FOV_y):
     # input:
     # Dec,RA，Roll: the Dec & RA & Roll of the optical axis
-    # Dec_i,RA_i: the Dec & RA of the ith star
+    # v_inertial: the unit vectors of the stars, shape: (num_star, 3)
     # N_x,N_y: the resolution of the picture
     # FOV_x,FOV_y: the FOV of the CCD
-    # calculate the rotate matrix Rx by theta_x
     # output:
-    # x_s_rot, y_s_rot: the pixel coordinate of the image
-    theta_x = -(math.pi / 2 - Dec)
-    Rx = [
-        [1, 0, 0],
-        [0, np.cos(theta_x), np.sin(theta_x)],
-        [0, -np.sin(theta_x), np.cos(theta_x)],
-    ]
-    # calculate the rotate matrix Rz by theta_z
-    theta_z = -(math.pi / 2 - RA)
-    Rz = [
-        [np.cos(theta_z), np.sin(theta_z), 0],
-        [-np.sin(theta_z), np.cos(theta_z), 0],
-        [0, 0, 1],
-    ]
-    R = np.matmul(Rx, Rz)
-    # calculate the inertial vector in inertial space
-    v_inertial = [
-        np.cos(RA_i) * np.cos(Dec_i),
-        np.sin(RA_i) * np.cos(Dec_i),
-        np.sin(Dec_i),
-    ]
-    # transfer the inertial vector to body vector in CCD space
-    v_body = np.matmul(R, v_inertial)
-    # project to the pixel coordinate (the space origin is the center of the image)
-    Xr = -v_body[0] / v_body[2] * N_x / 2 / np.tan(FOV_x / 2 * deg2rad)
-    Yr = -v_body[1] / v_body[2] * N_y / 2 / np.tan(FOV_y / 2 * deg2rad)
+    # x_s_rot, y_s_rot: the arrays of the pixel coordinate of the image
+    Xr, Yr = project_stars(Dec, RA, v_inertial, N_x, N_y, FOV_x, FOV_y)
     # rotate the stars
-    R_rotate = np.array([[np.cos(Roll), np.sin(Roll)], [-np.sin(Roll), np.cos(Roll)]])
-    xy_s_rot = np.matmul(R_rotate, np.array([[Xr], [Yr]]))
-    x_s_rot = xy_s_rot[0][0]
-    y_s_rot = xy_s_rot[1][0]
+    x_s_rot = np.cos(Roll) * Xr + np.sin(Roll) * Yr
+    y_s_rot = -np.sin(Roll) * Xr + np.cos(Roll) * Yr
     return x_s_rot, y_s_rot
 
 
 # simulate the stellar image
-def img_simu_lines(lines, RDR, FOV, N, VM_thre, R, Color):
+def img_simu_lines(catalog, sky_index, RDR, FOV, N, VM_thre, R, Color):
     # input:
+    # catalog: the catalog dict, see load_catalog
+    # sky_index: the SkyIndex of the catalog
     # RDR: RA_oa,Dec_oa,Roll_oa
     # FOV: FOV_x,FOV_y
     # N: N_x,N_y
@@ -98,7 +84,6 @@ def img_simu_lines(lines, RDR, FOV, N, VM_thre, R, Color):
     # output:
     # stellar image: img
     # stellar data: txt_list
-    num_star = len(lines)
     RA_oa, Dec_oa, Roll_oa = RDR
     FOV_x, FOV_y = FOV
     N_x, N_y = N
@@ -115,42 +100,48 @@ def img_simu_lines(lines, RDR, FOV, N, VM_thre, R, Color):
     vx_oa = np.cos(RA_oa) * np.cos(Dec_oa)
     vy_oa = np.sin(RA_oa) * np.cos(Dec_oa)
     vz_oa = np.sin(Dec_oa)
+    v_oa = np.array([vx_oa, vy_oa, vz_oa])
     # save txt file and image
     txt_list = []
     img = np.zeros((N_y, N_x, 3), np.uint8)  # in numpy:(height,width), so:(N_y,N_x)
     img[:, :, 0] += Color_back[0]
     img[:, :, 1] += Color_back[1]
     img[:, :, 2] += Color_back[2]
-    for i_s in range(num_star):
-        data_s = lines[i_s].strip().split()
-        assert len(data_s) == 4
-        # generate unit vector for calculating angular distance
-        CN_s, VM_s, RA_s, Dec_s = data_s
-        CN_s, VM_s, RA_s, Dec_s = int(CN_s), float(VM_s), float(RA_s), float(Dec_s)
-        vx_s = np.cos(RA_s) * np.cos(Dec_s)
-        vy_s = np.sin(RA_s) * np.cos(Dec_s)
-        vz_s = np.sin(Dec_s)
-        # AD_oa_s: the angular distance between optical axis & star
-        cos = vx_oa * vx_s + vy_oa * vy_s + vz_oa * vz_s
-        AD_oa_s = np.arccos(np.clip(cos, -1, 1)) * rad2deg
-        # x_s, y_s: the project coordinate of neighbor star
-        x_s, y_s = project_1s(
-            Dec_oa, RA_oa, Roll_oa, Dec_s, RA_s, N_x, N_y, FOV_x, FOV_y
-        )
-        if AD_oa_s <= FOV_max:
-            if abs(x_s) > N_x / 2 or abs(y_s) > N_y / 2:
-                # print('Some stars fall out of the image! ')
-                pass
-            else:
-                # save txt file
-                txt_list.append(f"{CN_s} {VM_s} {x_s} {y_s} {RA_s} {Dec_s}")
-                # save image
-                x_pixel = int(x_s + N_x / 2)  # in cv2: (x,y)
-                y_pixel = int(y_s + N_y / 2)
-                R = min(
-                    int((VM_thre - VM_s) / VM_thre * R_max) + 1, R_max
-                )  # the darkest is 1, the brightest is R_max
-                cv2.circle(img, (x_pixel, y_pixel), R, Color_star, -1)
+    # the stars whose AD with optical axis is less than FOV_max
+    i_s_list = sky_index.query(v_oa, FOV_max)
+    # AD_oa_s: the angular distance between optical axis & star
+    cos = np.matmul(catalog["v_inertial"][i_s_list], v_oa)
+    AD_oa_s = np.arccos(np.clip(cos, -1, 1)) * rad2deg
+    i_s_list = i_s_list[AD_oa_s <= FOV_max]
+    # x_s, y_s: the project coordinate of neighbor star
+    x_s_list, y_s_list = project_stars_roll(
+        Dec_oa,
+        RA_oa,
+        Roll_oa,
+        catalog["v_inertial"][i_s_list],
+        N_x,
+        N_y,
+        FOV_x,
+        FOV_y,
+    )
+    for i_s, x_s, y_s in zip(i_s_list, x_s_list, y_s_list):
+        if abs(x_s) > N_x / 2 or abs(y_s) > N_y / 2:
+            # print('Some stars fall out of the image! ')
+            pass
+        else:
+            CN_s = catalog["CN"][i_s]
+            VM_s = catalog["VM"][i_s]
+            RA_s = catalog["RA"][i_s]
+            Dec_s = catalog["Dec"][i_s]
+            # save txt file
+            txt_list.append(f"{CN_s} {VM_s} {x_s} {y_s} {RA_s} {Dec_s}")
+            # save image
+            x_pixel = int(x_s + N_x / 2)  # in cv2: (x,y)
+            y_pixel = int(y_s + N_y / 2)
+            R = min(
+                int((VM_thre - VM_s) / VM_thre * R_max) + 1, R_max
+            )  # the darkest is 1, the brightest is R_max
+            cv2.circle(img, (x_pixel, y_pixel), R, Color_star, -1)
     return img, txt_list
 
 
@@ -166,7 +157,8 @@ class RandomSimuThread(QtCore.QThread):
         if_cam_view,
         if_cam_save,
         view_result,
-        f_star_path,
+        catalog,
+        sky_index,
         FOV,
         N,
         VM_thre,
@@ -179,11 +171,9 @@ class RandomSimuThread(QtCore.QThread):
         self.if_cam_view = if_cam_view
         self.if_cam_save = if_cam_save
         self.view_result = view_result
-        # read the SAO database
-        f_star = open(f_star_path, "r+")
-        self.lines = f_star.readlines()
-        f_star.close()
-        self.num_star = len(self.lines)
+        # the SAO database & its SkyIndex
+        self.catalog = catalog
+        self.sky_index = sky_index
         self.FOV = FOV
         self.N = N
         self.R = R
@@ -203,7 +193,14 @@ class RandomSimuThread(QtCore.QThread):
             RDR = [RA_oa, Dec_oa, Roll_oa]
             # 进行星图仿真
             img, txt_list = img_simu_lines(
-                self.lines, RDR, self.FOV, self.N, self.VM_thre, self.R, self.Color
+                self.catalog,
+                self.sky_index,
+                RDR,
+                self.FOV,
+                self.N,
+                self.VM_thre,
+                self.R,
+                self.Color,
             )
             # 通过信号槽显示图片
             if self.if_cam_view.checkState():
@@ -232,15 +229,47 @@ class StellarSimulation:
         self.view_cam = view_cam
         self.if_cam_save = check_cam_save
         self.if_cam_view = check_cam_view
+        # the loaded SAO database sorted by VM, key: f_star_path, value: the
+        # modification time of the file & the catalog
+        self.store_dict = dict()
+        # the selected stars & their SkyIndex, key: (f_star_path, VM_thre)
+        self.catalog_dict = dict()
+
+    # 星表与tools中的工具共用cache_helper的catalog阶段，返回按亮度排序的星表路径
+    # 若星表未生成，或SAO文件已改变，则返回None
+    def find_catalog(self, f_all_star_path, database_root):
+        manifest = gen_stage_manifests(
+            dict(), "catalog", f_all_star_path, database_root
+        )["catalog"]
+        if not is_cached(manifest):
+            return None
+        return os.path.join(manifest["dir"], "sao_VM_sorted.npz")
+
+    # 读取星表数据，每个星表只读取一次，每个亮度阈值只建立一次SkyIndex
+    # 星表被tools/update_database.py更新后重新读取
+    def load_catalog(self, f_star_path, VM_thre):
+        mtime_ns = os.stat(f_star_path).st_mtime_ns
+        if self.store_dict.get(f_star_path, (None, None))[0] != mtime_ns:
+            self.store_dict[f_star_path] = (mtime_ns, load_catalog(f_star_path))
+            self.catalog_dict = {
+                key: value
+                for key, value in self.catalog_dict.items()
+                if key[0] != f_star_path
+            }
+        if (f_star_path, VM_thre) not in self.catalog_dict:
+            catalog = select_VM(self.store_dict[f_star_path][1], VM_thre)
+            sky_index = SkyIndex(catalog["v_inertial"])
+            self.catalog_dict[(f_star_path, VM_thre)] = (catalog, sky_index)
+        return self.catalog_dict[(f_star_path, VM_thre)]
 
     # 进行单张星图仿真的函数
     def img_simu_file(self, f_star_path, RDR, FOV, N, VM_thre, R, Color, Save_dir):
         # 读取星表数据
-        f_star = open(f_star_path, "r+")
-        lines = f_star.readlines()
-        f_star.close()
+        catalog, sky_index = self.load_catalog(f_star_path, VM_thre)
         # 进行星图仿真
-        img, txt_list = img_simu_lines(lines, RDR, FOV, N, VM_thre, R, Color)
+        img, txt_list = img_simu_lines(
+            catalog, sky_index, RDR, FOV, N, VM_thre, R, Color
+        )
         # 展示星图
         if self.if_cam_view.checkState():
             height, width, _ = img.shape
@@ -275,40 +304,37 @@ class StellarSimulation:
             )
             cv2.imwrite(img_path, img)
 
-    # 根据亮度阈值进行恒星筛选的函数
-    def select_VM(self, f_all_star_path, f_star_path, VM_thre):
-        f_all_star = open(f_all_star_path)
-        lines = f_all_star.readlines()
-        f_all_star.close()
-        f_star = open(f_star_path, "w+")
-        # select the stars whose VM is less than VM_thre
-        CN_list = []
-        VM_list = []
-        RA_list = []
-        Dec_list = []
-        for line in lines:
-            # line: len(line) = 205, line[204] = '\n'
-            CN = line[0:6]
-            VM = line[80:84]
-            RA = line[183:193]
-            Dec = line[193:204]
-            if float(VM) < VM_thre:
-                f_star.write(f"{CN} {VM} {RA} {Dec}\n")
-                CN_list.append(CN)
-                VM_list.append(VM)
-                RA_list.append(RA)
-                Dec_list.append(Dec)
-        f_star.close()
+    # 根据亮度阈值进行恒星筛选的函数，返回筛选出的恒星数
+    # 按亮度排序的星表即tools/gen_catalog.py的catalog阶段，只在SAO文件改变时重新生成
+    def select_VM(self, f_all_star_path, database_root, VM_thre):
+        manifest = gen_stage_manifests(
+            dict(), "catalog", f_all_star_path, database_root
+        )["catalog"]
+        f_star_path = os.path.join(manifest["dir"], "sao_VM_sorted.npz")
+        if not is_cached(manifest):
+            # sort the stars by VM, then the stars whose VM is less than VM_thre
+            # are a prefix of the catalog
+            clear_stage(manifest)
+            save_catalog(gen_VM_sorted_catalog(read_SAO(f_all_star_path)), f_star_path)
+            save_manifest(manifest)
+        else:
+            # the tools use the catalog of this SAO file, see cache_helper
+            set_current_manifest(manifest)
+        catalog, _ = self.load_catalog(f_star_path, VM_thre)
+        return len(catalog["CN"])
 
     # 进行随机仿真多张星图的函数
     def random_simu(self, f_star_path, num_simu, FOV, N, VM_thre, R, Color, Save_dir):
+        # 读取星表数据
+        catalog, sky_index = self.load_catalog(f_star_path, VM_thre)
         # 创建随机仿真多张星图的线程
         self.hThreadHandle = RandomSimuThread(
             num_simu,
             self.if_cam_view,
             self.if_cam_save,
             self.view_result,
-            f_star_path,
+            catalog,
+            sky_index,
             FOV,
             N,
             VM_thre,
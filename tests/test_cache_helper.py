@@ -0,0 +1,98 @@
+import json
+import os
+import pytest
+
+from easydict import EasyDict
+
+from utils.common.cache_helper import (
+    gen_stage_manifests,
+    hash_file,
+    is_cached,
+    load_updates,
+    save_manifest,
+    set_current_manifest,
+)
+
+
+def test_hash_file(tmp_path):
+    f_read_name = tmp_path / "sao"
+    f_read_name.write_bytes(b"SAO")
+    cache_dir = str(tmp_path / "database")
+    sha1 = hash_file(str(f_read_name), cache_dir)
+    assert sha1 == hash_file(str(f_read_name))
+
+    # the unchanged file is not read again
+    f_cache_name = tmp_path / "database" / "hash_cache.json"
+    cache = json.loads(f_cache_name.read_text())
+    for cached in cache.values():
+        cached["sha1"] = "cached"
+    f_cache_name.write_text(json.dumps(cache))
+    assert hash_file(str(f_read_name), cache_dir) == "cached"
+
+    # the changed file is read again
+    f_read_name.write_bytes(b"SAO updated")
+    assert hash_file(str(f_read_name), cache_dir) == hash_file(str(f_read_name))
+
+
+def test_updates(tmp_path):
+    f_read_name = str(tmp_path / "sao")
+    with open(f_read_name, "w") as fw:
+        fw.write("SAO")
+    database_root = str(tmp_path / "database")
+    para_list = [
+        EasyDict(
+            VM_thre=VM_thre, AD_2s_thre=0.19, FOV_x=20, FOV_y=20, N_x=1024, N_y=1024
+        )
+        for VM_thre in [5.0, 6.0]
+    ]
+
+    def gen_manifests(para):
+        return gen_stage_manifests(para, "star_image", f_read_name, database_root)
+
+    for para in para_list:
+        manifests = gen_manifests(para)
+        for manifest in manifests.values():
+            save_manifest(manifest)
+        assert is_cached(manifests["star_image"])
+
+    # update the catalog & the star images of the 1st parameters
+    manifests = gen_manifests(para_list[0])
+    save_manifest(manifests["catalog"], [{"delete": [1], "insert": []}])
+    assert not is_cached(gen_manifests(para_list[0])["star_image"])
+    save_manifest(gen_manifests(para_list[0])["star_image"])
+
+    # the fingerprints are not changed, the 2nd star images are out of date
+    manifests_updated = gen_manifests(para_list[0])
+    assert manifests_updated["star_image"]["dir"] == manifests["star_image"]["dir"]
+    assert load_updates(manifests_updated["catalog"]) == [{"delete": [1], "insert": []}]
+    assert is_cached(manifests_updated["catalog"])
+    assert is_cached(manifests_updated["star_image"])
+    assert not is_cached(gen_manifests(para_list[1])["star_image"])
+
+
+def test_current_catalog(tmp_path):
+    database_root = str(tmp_path / "database")
+    para = EasyDict(
+        VM_thre=6.0, AD_2s_thre=0.19, FOV_x=20, FOV_y=20, N_x=1024, N_y=1024
+    )
+    with pytest.raises(FileNotFoundError):
+        gen_stage_manifests(para, "star_image", database_root=database_root)
+
+    # generate the catalogs of 2 SAO files, the last one is the current one
+    manifests_list = []
+    for text in ["SAO", "SAO updated"]:
+        f_read_name = str(tmp_path / "sao")
+        with open(f_read_name, "w") as fw:
+            fw.write(text)
+        manifests = gen_stage_manifests(para, "star_image", f_read_name, database_root)
+        save_manifest(manifests["catalog"])
+        manifests_list.append(manifests)
+
+    # the downstream stages are keyed by the current catalog without the SAO file
+    os.remove(f_read_name)
+    manifests = gen_stage_manifests(para, "star_image", database_root=database_root)
+    assert manifests["star_image"] == manifests_list[1]["star_image"]
+    assert is_cached(manifests["catalog"])
+    set_current_manifest(manifests_list[0]["catalog"])
+    manifests = gen_stage_manifests(para, "star_image", database_root=database_root)
+    assert manifests["star_image"] == manifests_list[0]["star_image"]
@@ -0,0 +1,59 @@
+import multiprocessing
+import numpy as np
+import os
+import pytest
+import sys
+
+from easydict import EasyDict
+
+from utils.common.mst_helper import gen_mst
+from utils.database.database_helper import (
+    GraphDatabase,
+    attach_database,
+    database_keys,
+    gen_database_arrays,
+    share_database,
+)
+from utils.database.k_vector_helper import gen_k_vertor
+
+
+# attach the database in a child process & copy the arrays back
+def attach_worker(database_desc):
+    database = attach_database(database_desc)
+    arrays = dict()
+    for key in database_keys:
+        # the arrays are read-only views of the shared memory
+        assert not database.arrays[key].flags.owndata
+        assert not database.arrays[key].flags.writeable
+        arrays[key] = np.array(database.arrays[key])
+    return arrays
+
+
+@pytest.mark.skipif(sys.version_info < (3, 8), reason="needs shared_memory")
+def test_share_database(gen_random_M_adj):
+    rng = np.random.default_rng(0)
+    graph_list = []
+    for CN_ms in range(100, 110):
+        M_adj = gen_random_M_adj(rng, int(rng.integers(3, 9)))
+        graph, _ = gen_mst({"CN_ms": CN_ms, "M_adj": M_adj})
+        graph_list.append(graph)
+    graph_list.sort(key=lambda graph: graph["AD_sum_mst"])
+    para = EasyDict(epsilon_machine=2.22e-16)
+    arrays = gen_database_arrays(graph_list, gen_k_vertor(graph_list, para))
+
+    shm_list, database_desc = share_database(GraphDatabase(arrays))
+    try:
+        with multiprocessing.Pool(1) as pool:
+            arrays_attach = pool.apply(attach_worker, (database_desc,))
+    finally:
+        for shm in shm_list:
+            shm.close()
+            shm.unlink()
+    for key in database_keys:
+        np.testing.assert_array_equal(arrays_attach[key], arrays[key])
+        assert arrays_attach[key].dtype == np.asarray(arrays[key]).dtype
+
+    # nothing is left in the shared memory after the publisher unlinks it
+    if os.path.isdir("/dev/shm"):
+        for shm in shm_list:
+            assert not os.path.exists(os.path.join("/dev/shm", shm.name))
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from easydict import EasyDict
+
+from utils.database.k_vector_helper import gen_k_vector_AD_sum
+from utils.search.k_vector_helper import search_k_vector
+
+
+def gen_AD_sum_mst(rng, num_graph):
+    return np.sort(rng.uniform(10, 40, num_graph))
+
+
+def test_gen_k_vector():
+    rng = np.random.default_rng(0)
+    AD_sum_mst = gen_AD_sum_mst(rng, 1000)
+    k_vector, q, m = gen_k_vector_AD_sum(AD_sum_mst, EasyDict(epsilon_machine=1e-15))
+    # the ith element of k-vector is the number of AD sum that <= m * i + q
+    k_vector_loop = [
+        sum(AD_sum <= m * i + q for AD_sum in AD_sum_mst) for i in range(1000)
+    ]
+    np.testing.assert_array_equal(k_vector, k_vector_loop)
+    assert k_vector[0] == 0
+    assert k_vector[-1] == len(AD_sum_mst)
+
+
+@pytest.mark.parametrize("epsilon_AD", [0.01, 0.3, 5])
+def test_search_k_vector(epsilon_AD):
+    rng = np.random.default_rng(1)
+    AD_sum_mst = gen_AD_sum_mst(rng, 1000)
+    k_vector, q, m = gen_k_vector_AD_sum(AD_sum_mst, EasyDict(epsilon_machine=1e-15))
+    # the search range covers every graph found by the brute force search
+    for AD_mst_search in np.concatenate([rng.uniform(5, 45, 100), AD_sum_mst[::50]]):
+        i_start, i_end = search_k_vector(AD_mst_search, k_vector, q, m, epsilon_AD)
+        i_match = np.flatnonzero(np.abs(AD_sum_mst - AD_mst_search) <= epsilon_AD)
+        if len(i_match):
+            assert i_start <= i_match[0]
+            assert i_end >= i_match[-1]
@@ -0,0 +1,190 @@
+import numpy as np
+import pytest
+import tracemalloc
+import warnings
+
+from easydict import EasyDict
+
+from utils.search import match_helper
+from utils.search.match_helper import (
+    find_prin_eigenvector,
+    gen_affinity_matrix,
+    match_graph,
+    match_graph_batch,
+    power_iteration,
+    power_iteration_batch,
+)
+
+
+# the affinity matrix built element by element, as match_graph did before
+def gen_affinity_matrix_loop(M_adj_g1, M_adj_g2, para):
+    num_g1, num_g2 = len(M_adj_g1), len(M_adj_g2)
+    i_diag = [(i_g1, i_g2) for i_g1 in range(num_g1) for i_g2 in range(num_g2)]
+    M_affi = np.zeros((num_g1 * num_g2, num_g1 * num_g2))
+    for i, (i_g1_s1, i_g2_s1) in enumerate(i_diag):
+        for j, (i_g1_s2, i_g2_s2) in enumerate(i_diag):
+            if i_g1_s1 != i_g1_s2 and i_g2_s1 != i_g2_s2:
+                sub_AD = abs(M_adj_g1[i_g1_s1][i_g1_s2] - M_adj_g2[i_g2_s1][i_g2_s2])
+                M_affi[i][j] = 1 / np.exp(para.times_sub_AD * sub_AD)
+    return M_affi
+
+
+def test_gen_affinity_matrix(gen_random_M_adj):
+    rng = np.random.default_rng(0)
+    para = EasyDict(times_sub_AD=1.74)
+    M_adj_g1 = gen_random_M_adj(rng, 5)
+    M_adj_g2 = gen_random_M_adj(rng, 7)
+    np.testing.assert_allclose(
+        gen_affinity_matrix(M_adj_g1, M_adj_g2, para),
+        gen_affinity_matrix_loop(M_adj_g1, M_adj_g2, para),
+    )
+
+
+@pytest.mark.parametrize("eig_mode", ["eigh", "power"])
+def test_find_prin_eigenvector(eig_mode, gen_random_M_adj):
+    rng = np.random.default_rng(1)
+    para = EasyDict(times_sub_AD=1.74)
+    M_affi = gen_affinity_matrix(
+        gen_random_M_adj(rng, 6), gen_random_M_adj(rng, 8), para
+    )
+    prin_eigenvector = find_prin_eigenvector(M_affi, EasyDict(eig_mode="eig"))
+    np.testing.assert_allclose(
+        find_prin_eigenvector(M_affi, EasyDict(eig_mode=eig_mode)),
+        prin_eigenvector,
+        atol=1e-8,
+    )
+
+
+def test_power_iteration_fallback(gen_random_M_adj):
+    # the power iteration does not converge in 1 iteration, so eigh is used
+    rng = np.random.default_rng(2)
+    para = EasyDict(times_sub_AD=1.74)
+    M_affi = gen_affinity_matrix(
+        gen_random_M_adj(rng, 6), gen_random_M_adj(rng, 8), para
+    )
+    np.testing.assert_array_equal(
+        find_prin_eigenvector(M_affi, EasyDict(eig_mode="power", eig_max_iter=1)),
+        find_prin_eigenvector(M_affi, EasyDict(eig_mode="eigh")),
+    )
+
+
+def test_power_iteration_warning(gen_random_M_adj):
+    # there is no affinity matrix to fall back to in the implicit mode
+    rng = np.random.default_rng(3)
+    para = EasyDict(times_sub_AD=1.74, affi_mode="implicit", eig_max_iter=1)
+    with pytest.warns(UserWarning, match="does not converge"):
+        match_graph(gen_random_M_adj(rng, 6), gen_random_M_adj(rng, 8), para)
+
+
+def test_power_iteration_batch(gen_random_M_adj):
+    # most of the random 3x3 matches oscillate, each candidate has its own flag
+    rng = np.random.default_rng(0)
+    para = EasyDict(times_sub_AD=1.74)
+    M_affi = np.stack(
+        [
+            gen_affinity_matrix(
+                gen_random_M_adj(rng, 3), gen_random_M_adj(rng, 3), para
+            )
+            for _ in range(10)
+        ]
+    )
+    prin_eigenvector, converged = power_iteration_batch(M_affi, para)
+    assert converged.any() and not converged.all()
+    for i_batch in range(len(M_affi)):
+        prin_eigenvector1, converged1 = power_iteration(
+            M_affi[i_batch].dot, 9, para
+        )
+        assert converged[i_batch] == converged1
+        np.testing.assert_allclose(
+            prin_eigenvector[i_batch], prin_eigenvector1, atol=1e-12
+        )
+
+
+def test_auto_affi_mode_small_graph(gen_random_M_adj):
+    # the implicit mode is never picked for a graph of 5 vertexes or less
+    rng = np.random.default_rng(0)
+    para = EasyDict(times_sub_AD=1.74, affi_max_bytes=1)
+    for _ in range(10):
+        M_adj_g1 = gen_random_M_adj(rng, 3)
+        M_adj_g2 = gen_random_M_adj(rng, 3)
+        para.affi_mode = "auto"
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            error = match_graph(M_adj_g1, M_adj_g2, para)
+        para.affi_mode = "dense"
+        assert error == match_graph(M_adj_g1, M_adj_g2, para)
+
+
+@pytest.mark.parametrize("eig_mode", ["eig", "eigh", "power"])
+@pytest.mark.parametrize("discrete_mode", ["greedy", "hungarian"])
+def test_match_graph_batch(eig_mode, discrete_mode, gen_random_M_adj):
+    if discrete_mode == "hungarian":
+        pytest.importorskip("scipy")
+    # the candidates of mixed sizes, some of which are smaller than the query
+    rng = np.random.default_rng(4)
+    para = EasyDict(
+        times_sub_AD=1.74,
+        eig_mode=eig_mode,
+        discrete_mode=discrete_mode,
+        match_batch=True,
+        match_batch_size=4,
+    )
+    M_adj_g1 = gen_random_M_adj(rng, 8)
+    M_adj_g2_list = [
+        gen_random_M_adj(rng, num_star) for num_star in rng.integers(6, 11, size=20)
+    ]
+    errors = [match_graph(M_adj_g1, M_adj_g2, para) for M_adj_g2 in M_adj_g2_list]
+    np.testing.assert_allclose(
+        match_graph_batch(M_adj_g1, M_adj_g2_list, para), errors, atol=1e-12
+    )
+
+
+def test_match_graph_batch_large(gen_random_M_adj):
+    # a dense affinity matrix of 40x40 stars costs 20 MB, more than the budget
+    rng = np.random.default_rng(5)
+    para = EasyDict(
+        times_sub_AD=1.74,
+        eig_mode="power",
+        affi_mode="auto",
+        affi_max_bytes=8 * 2**20,
+        match_batch=True,
+    )
+    M_adj_g1 = gen_random_M_adj(rng, 40)
+    M_adj_g2_list = [gen_random_M_adj(rng, 40) for _ in range(3)]
+    M_adj_g2_list.append(M_adj_g1[::-1, ::-1])
+    tracemalloc.start()
+    errors = match_graph_batch(M_adj_g1, M_adj_g2_list, para)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert peak < 4 * 2**20
+
+    para.affi_mode = "dense"
+    np.testing.assert_allclose(
+        errors,
+        [match_graph(M_adj_g1, M_adj_g2, para) for M_adj_g2 in M_adj_g2_list],
+        atol=1e-12,
+    )
+    assert errors[-1] < 1e-12
+
+
+def test_small_graph_eigh(monkeypatch, gen_random_M_adj):
+    # the power iteration is never run for a graph of 5 vertexes or less
+    def power_iteration_raise(*args):
+        raise AssertionError("the power iteration is run")
+
+    monkeypatch.setattr(match_helper, "power_iteration", power_iteration_raise)
+    monkeypatch.setattr(match_helper, "power_iteration_batch", power_iteration_raise)
+    rng = np.random.default_rng(6)
+    para = EasyDict(times_sub_AD=1.74, match_batch=True)
+    M_adj_g1 = gen_random_M_adj(rng, 5)
+    M_adj_g2_list = [gen_random_M_adj(rng, num_star) for num_star in [3, 4, 5, 5, 6]]
+    para.eig_mode = "eigh"
+    errors = match_graph_batch(M_adj_g1, M_adj_g2_list, para)
+    para.eig_mode = "power"
+    np.testing.assert_array_equal(
+        match_graph_batch(M_adj_g1, M_adj_g2_list, para), errors
+    )
+    para.match_batch = False
+    np.testing.assert_allclose(
+        match_graph_batch(M_adj_g1, M_adj_g2_list, para), errors, atol=1e-12
+    )
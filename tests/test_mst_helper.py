@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from utils.common.mst_helper import gen_mst
+
+
+@pytest.mark.parametrize("num_star", [2, 3, 10, 40])
+def test_prim_kruskal(num_star, gen_random_M_adj):
+    rng = np.random.default_rng(num_star)
+    M_adj = gen_random_M_adj(rng, num_star)
+    graph_prim, mst_prim = gen_mst({"M_adj": M_adj}, "prim")
+    graph_kruskal, mst_kruskal = gen_mst({"M_adj": M_adj}, "kruskal")
+    assert len(mst_prim) == num_star - 1
+    assert mst_prim == mst_kruskal
+    assert graph_prim["AD_sum_mst"] == graph_kruskal["AD_sum_mst"]
+
+
+def test_prim_scipy(gen_random_M_adj):
+    csgraph = pytest.importorskip("scipy.sparse.csgraph")
+    rng = np.random.default_rng(0)
+    M_adj = gen_random_M_adj(rng, 30)
+    graph, _ = gen_mst({"M_adj": M_adj}, "prim")
+    AD_sum_mst = csgraph.minimum_spanning_tree(M_adj).sum()
+    np.testing.assert_allclose(graph["AD_sum_mst"], AD_sum_mst)
@@ -0,0 +1,56 @@
+from multiprocessing import Pool
+
+import numpy as np
+
+from easydict import EasyDict
+
+from utils.common.star_frame_helper import gen_star_frame
+from utils.noise_helper import add_noise, gen_trial_rng
+
+
+seed = 42
+args = EasyDict(std_position=1.0, num_lost=2, num_false=2)
+para = EasyDict(N_x=1024, N_y=1024)
+
+
+def gen_frame():
+    frame = gen_star_frame(10)
+    frame["CN"] = np.arange(1, 11)
+    frame["x"] = np.arange(10) * 10.0
+    frame["y"] = np.arange(10) * -10.0
+    return frame
+
+
+# the star frame as a float array, whose nan fields could be compared
+def to_array(frame):
+    return np.array(frame.tolist(), dtype=float)
+
+
+def add_noise_trial(i_trial):
+    frame = add_noise(gen_frame(), args, para, gen_trial_rng(seed, i_trial))
+    return to_array(frame)
+
+
+def test_trial_rng():
+    # the noise of a trial does not depend on the order or the process
+    num_trial = 8
+    frames = [add_noise_trial(i_trial) for i_trial in range(num_trial)]
+    frames_reversed = [add_noise_trial(i_trial) for i_trial in range(num_trial)[::-1]]
+    with Pool(2) as pool:
+        frames_pool = pool.map(add_noise_trial, range(num_trial), chunksize=1)
+    for i_trial in range(num_trial):
+        np.testing.assert_array_equal(frames[i_trial], frames_reversed[-1 - i_trial])
+        np.testing.assert_array_equal(frames[i_trial], frames_pool[i_trial])
+    # the trials are different
+    assert not np.array_equal(frames[0], frames[1], equal_nan=True)
+
+
+def test_add_noise():
+    frame = gen_frame()
+    frame_noise = add_noise(frame, args, para, gen_trial_rng(seed, 0))
+    # the star frame is not changed
+    np.testing.assert_array_equal(to_array(frame), to_array(gen_frame()))
+    assert len(frame_noise) == len(frame) - args.num_lost + args.num_false
+    # the main star is never lost, the false stars have no CN
+    assert frame_noise["CN"][0] == 1
+    assert np.all(frame_noise["CN"][-args.num_false :] == 0)
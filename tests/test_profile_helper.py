@@ -0,0 +1,30 @@
+import json
+
+from utils.common.profile_helper import Profiler, save_profile, summarize_records
+
+
+def test_save_profile(tmp_path):
+    profiler = Profiler(enabled=True)
+    records = []
+    for min_error in [0.1, float("inf")]:
+        profiler.reset()
+        with profiler.stage("identify"):
+            profiler.count("num_match", 3)
+        profiler.note("top_candidates", [[110, min_error]])
+        record = profiler.record()
+        record["min_error"] = min_error
+        records.append(record)
+    summary = summarize_records(records)
+    assert summary["counters"]["num_match"]["total"] == 6
+
+    # the inf min_error is saved as null
+    save_profile(records, summary, str(tmp_path))
+    with open(tmp_path / "profile.jsonl") as fr:
+        records_load = [json.loads(line) for line in fr]
+    assert [record["min_error"] for record in records_load] == [0.1, None]
+    assert [record["notes"] for record in records_load] == [
+        {"top_candidates": [[110, 0.1]]},
+        {"top_candidates": [[110, None]]},
+    ]
+    with open(tmp_path / "profile_summary.json") as fr:
+        assert json.load(fr)["num_query"] == 2
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from utils.sao_helper import gen_VM_sorted_catalog, read_SAO
+
+
+# the SAO records with random characters outside the fields, the VMs have ties
+def gen_SAO_lines(rng, num_star):
+    lines = []
+    for CN in rng.choice(np.arange(1, 258998), num_star, replace=False):
+        line = list("".join(rng.choice(list("ABCXYZ+-.0123456789 "), 204)))
+        line[0:6] = f"{CN:6d}"
+        line[80:84] = f"{rng.integers(-10, 100) / 10:4.1f}"
+        line[183:193] = f"{rng.uniform(0, 2 * np.pi):10.8f}"
+        line[193:204] = f"{rng.uniform(-np.pi / 2, np.pi / 2):+11.8f}"
+        lines.append("".join(line))
+    return lines
+
+
+@pytest.mark.parametrize("last_newline", [True, False])
+def test_read_SAO(tmp_path, last_newline):
+    rng = np.random.default_rng(0)
+    lines = gen_SAO_lines(rng, 50)
+    f_read_name = tmp_path / "sao"
+    with open(f_read_name, "w") as fw:
+        fw.write("\n".join(lines) + ("\n" if last_newline else ""))
+    catalog = gen_VM_sorted_catalog(read_SAO(str(f_read_name)))
+
+    # the fields sliced from every line, as convert_SAO_to_txt did
+    CN = np.array([int(line[0:6]) for line in lines])
+    VM = np.array([float(line[80:84]) for line in lines])
+    RA = np.array([float(line[183:193]) for line in lines])
+    Dec = np.array([float(line[193:204]) for line in lines])
+    i_sort = np.argsort(VM, kind="stable")
+    np.testing.assert_array_equal(catalog["CN"], CN[i_sort])
+    np.testing.assert_array_equal(catalog["VM"], VM[i_sort])
+    np.testing.assert_array_equal(catalog["RA"], RA[i_sort])
+    np.testing.assert_array_equal(catalog["Dec"], Dec[i_sort])
+    assert np.all(np.diff(catalog["VM"]) >= 0)
+    np.testing.assert_allclose(np.linalg.norm(catalog["v_inertial"], axis=1), 1)
@@ -0,0 +1,43 @@
+import numpy as np
+
+from easydict import EasyDict
+
+from utils.common.mst_helper import gen_mst
+from utils.common.profile_helper import Profiler
+from utils.database.database_helper import GraphDatabase, gen_database_arrays
+from utils.database.k_vector_helper import gen_k_vertor
+from utils.search.search_helper import gen_epsilon_AD_list, search_graph
+
+
+def test_search_graph(gen_random_M_adj):
+    rng = np.random.default_rng(0)
+    para = EasyDict(
+        times_sub_AD=1.74,
+        eig_mode="eigh",
+        epsilon_machine=2.22e-16,
+        epsilon_AD_list=gen_epsilon_AD_list(0.1, 6),
+        epsilon_error=0,
+        num_top=3,
+    )
+    graph_list = []
+    for CN_ms in range(100, 120):
+        graph, _ = gen_mst({"CN_ms": CN_ms, "M_adj": gen_random_M_adj(rng, 8)})
+        graph_list.append(graph)
+    graph_list.sort(key=lambda graph: graph["AD_sum_mst"])
+    arrays = gen_database_arrays(graph_list, gen_k_vertor(graph_list, para))
+    database = GraphDatabase(arrays)
+
+    # the query is a graph of the database, every candidate is matched since
+    # epsilon_error is 0
+    profiler = Profiler(enabled=True)
+    i_target, min_error = search_graph(graph_list[5], database, para, profiler)
+    assert i_target == 5 and min_error < 1e-12
+    top_candidates = profiler.record()["notes"]["top_candidates"]
+    assert len(top_candidates) == 3
+    assert top_candidates[0] == [graph_list[5]["CN_ms"], min_error]
+    assert [error for _, error in top_candidates] == sorted(
+        error for _, error in top_candidates
+    )
+
+    # the best matches are not kept without the profile
+    assert search_graph(graph_list[5], database, para) == (i_target, min_error)
@@ -0,0 +1,37 @@
+import math
+
+import numpy as np
+import pytest
+
+from utils.common.sky_index_helper import SkyIndex
+
+
+def gen_random_v(rng, num_star):
+    v = rng.normal(size=(num_star, 3))
+    return v / np.linalg.norm(v, axis=1, keepdims=True)
+
+
+def query_brute_force(v_inertial, v, R_AD):
+    # the same radius as SkyIndex.query
+    R = min(R_AD * math.pi / 180 + 1e-9, math.pi)
+    return np.flatnonzero(np.matmul(v_inertial, v) >= np.cos(R))
+
+
+@pytest.mark.parametrize("zone_AD", [1, 5, 20])
+@pytest.mark.parametrize("R_AD", [0.5, 5, 30, 180])
+def test_query(zone_AD, R_AD):
+    rng = np.random.default_rng(0)
+    v_inertial = gen_random_v(rng, 20000)
+    sky_index = SkyIndex(v_inertial, zone_AD)
+    # random directions, the poles & the directions across RA = 0
+    v_list = np.concatenate(
+        [
+            gen_random_v(rng, 50),
+            [[0, 0, 1], [0, 0, -1], [1, 0, 0], [1, -1e-3, 0.5], [1, 1e-3, -0.5]],
+        ]
+    )
+    for v in v_list:
+        v = v / np.linalg.norm(v)
+        np.testing.assert_array_equal(
+            sky_index.query(v, R_AD), query_brute_force(v_inertial, v, R_AD)
+        )
@@ -0,0 +1,93 @@
+import numpy as np
+
+from easydict import EasyDict
+
+from tools.gen_database import gen_database
+from utils.common.sky_index_helper import SkyIndex
+from utils.database.database_helper import database_keys, load_database
+from utils.database.update_helper import update_catalog, update_database
+from utils.simulator_helper import gen_inertial_vector, simulate_one_star
+
+
+para = EasyDict(
+    R_AD=6,
+    AD_2s_thre=0.19,
+    FOV_x=20,
+    FOV_y=20,
+    FOV_max=np.sqrt(200),
+    N_x=1024,
+    N_y=1024,
+    epsilon_machine=2.22e-16,
+    database_dtype="float64",
+)
+
+
+# a catalog of the random stars over the whole sky, sorted by VM
+def gen_catalog(rng, CN_list, RA=None, Dec=None):
+    num_star = len(CN_list)
+    if RA is None:
+        RA = rng.uniform(0, 2 * np.pi, num_star)
+        Dec = np.arcsin(rng.uniform(-1, 1, num_star))
+    VM = np.round(rng.uniform(0, 6, num_star), 2)
+    i_sort = np.argsort(VM, kind="stable")
+    catalog = {
+        "CN": np.asarray(CN_list, dtype=int),
+        "VM": VM,
+        "RA": np.asarray(RA, dtype=float),
+        "Dec": np.asarray(Dec, dtype=float),
+    }
+    catalog["v_inertial"] = gen_inertial_vector(catalog["RA"], catalog["Dec"])
+    return {key: value[i_sort] for key, value in catalog.items()}
+
+
+def test_update_database(tmp_path):
+    rng = np.random.default_rng(0)
+    catalog_old = gen_catalog(rng, np.arange(1, 3001))
+    CN_delete_list = [int(CN) for CN in rng.choice(catalog_old["CN"], 20, False)]
+    # the last inserted star is a double star with the first star of the catalog
+    RA_insert = np.concatenate(
+        [rng.uniform(0, 2 * np.pi, 19), [catalog_old["RA"][0] + 0.001]]
+    )
+    Dec_insert = np.concatenate(
+        [np.arcsin(rng.uniform(-1, 1, 19)), [catalog_old["Dec"][0]]]
+    )
+    CN_insert_list = list(range(5001, 5021))
+    catalog_insert = gen_catalog(rng, CN_insert_list, RA_insert, Dec_insert)
+    catalog_new = update_catalog(catalog_old, CN_delete_list, catalog_insert)
+    assert len(catalog_new["CN"]) == 3000
+    assert np.all(np.diff(catalog_new["VM"]) >= 0)
+
+    # update the database of the old catalog
+    gen_database(catalog_old, str(tmp_path / "old"), para)
+    arrays = load_database(str(tmp_path / "old"), mmap_mode=None).arrays
+    assert int(catalog_old["CN"][0]) in arrays["CN_ms"]
+    sky_index_new = SkyIndex(catalog_new["v_inertial"], zone_AD=para.FOV_max)
+    arrays, frame_dict = update_database(
+        arrays,
+        catalog_old,
+        catalog_new,
+        sky_index_new,
+        CN_delete_list,
+        CN_insert_list,
+        para,
+    )
+
+    # the same as the database generated from the new catalog
+    gen_database(catalog_new, str(tmp_path / "new"), para)
+    arrays_new = load_database(str(tmp_path / "new"), mmap_mode=None).arrays
+    assert int(catalog_old["CN"][0]) not in arrays_new["CN_ms"]
+    for key in database_keys:
+        np.testing.assert_array_equal(arrays[key], arrays_new[key])
+
+    # the star images of the deleted stars are removed, the others are simulated
+    assert len(frame_dict) > len(CN_delete_list) + len(CN_insert_list)
+    for CN_ms, frame in frame_dict.items():
+        if CN_ms in CN_delete_list:
+            assert frame is None
+            continue
+        i_ms = int(np.flatnonzero(catalog_new["CN"] == CN_ms)[0])
+        frame_new = simulate_one_star(catalog_new, i_ms, para)
+        if frame_new is None:
+            assert frame is None
+        else:
+            np.testing.assert_array_equal(frame.tolist(), frame_new.tolist())
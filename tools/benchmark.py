@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+This code is used to benchmark the search over a grid of the noise settings.
+
+Every cell of the grid is a setting (std_position, num_lost, num_false) with a
+number of trials. The ith trial identifies the (i % num_image)th star image with
+the noise seeded by i (see identify), so a cell is reproducible & the trials can
+be more than the star images. The trials of all the cells are handled by one
+process pool, the latency of a trial is the time of identify in the worker.
+
+For every cell, the accuracy, the failure rate & the latency percentiles
+(p50/p95/p99) are saved in 'benchmark.csv' & 'benchmark.json', the json file
+also has the throughput of the whole run.
+
+Written in 2026.10.18
+"""
+
+
+import argparse
+import csv
+import itertools
+import json
+import numpy as np
+import os
+import time
+
+from easydict import EasyDict
+
+from tools.search import (
+    gen_para,
+    identify,
+    judge_result,
+    locate_search_inputs,
+    worker_context,
+    worker_pool,
+)
+from utils.common.profile_helper import replace_nonfinite
+from utils.database.database_helper import load_database
+
+
+parser = argparse.ArgumentParser(description="Benchmark Setting")
+parser.add_argument("--std_position", type=float, nargs="+", default=[0.0])
+parser.add_argument("--num_lost", type=int, nargs="+", default=[0])
+parser.add_argument("--num_false", type=int, nargs="+", default=[0])
+# the number of trials of every cell, 0: one trial for every star image
+parser.add_argument("--num_trials", type=int, nargs="+", default=[0])
+parser.add_argument("--workers", type=int, default=1)
+parser.add_argument("--output_dir", type=str, default="./results")
+
+
+benchmark_keys = [
+    "std_position",
+    "num_lost",
+    "num_false",
+    "num_trials",
+    "num_right",
+    "num_wrong",
+    "num_fail",
+    "accuracy",
+    "failure_rate",
+    "latency_mean",
+    "latency_p50",
+    "latency_p95",
+    "latency_p99",
+]
+
+
+# the cells of the grid
+# input:
+# the arguments, see parser
+# the number of the star images
+# output:
+# the cell list, every cell is a dict with the key-value: 'std_position',
+# 'num_lost', 'num_false', 'num_trials'
+def gen_grid(args, num_image):
+    cell_list = []
+    for std_position, num_lost, num_false, num_trials in itertools.product(
+        args.std_position, args.num_lost, args.num_false, args.num_trials
+    ):
+        cell_list.append(
+            {
+                "std_position": std_position,
+                "num_lost": num_lost,
+                "num_false": num_false,
+                "num_trials": num_trials if num_trials > 0 else num_image,
+            }
+        )
+    return cell_list
+
+
+# the trials of all the cells, (i_cell, i_trial, filepath, args of the noise)
+def gen_tasks(cell_list, filepaths):
+    for i_cell, cell in enumerate(cell_list):
+        args_cell = EasyDict(
+            {key: cell[key] for key in ["std_position", "num_lost", "num_false"]}
+        )
+        for i_trial in range(cell["num_trials"]):
+            filepath = filepaths[i_trial % len(filepaths)]
+            yield i_cell, i_trial, filepath, args_cell
+
+
+# run one trial, the latency is in ms
+def run_trial(task, database, para):
+    i_cell, i_trial, filepath, args_cell = task
+    time_start = time.perf_counter()
+    CN_ms, CN_ms_candidat, min_error = identify(
+        i_trial, filepath, database, para, args_cell
+    )
+    latency = (time.perf_counter() - time_start) * 1000
+    return i_cell, judge_result(CN_ms, CN_ms_candidat, min_error, para), latency
+
+
+def run_trial_worker(task):
+    return run_trial(task, worker_context["database"], worker_context["para"])
+
+
+# summarize the trials of a cell
+# input:
+# the cell, the results ('right', 'wrong' or 'fail') & the latencies of its trials
+# output:
+# the row of the cell, see benchmark_keys
+def summarize_cell(cell, result_list, latency_list):
+    row = dict(cell)
+    for result in ["right", "wrong", "fail"]:
+        row["num_" + result] = result_list.count(result)
+    num_match = row["num_right"] + row["num_wrong"]
+    row["accuracy"] = row["num_right"] / num_match if num_match else float("nan")
+    row["failure_rate"] = row["num_fail"] / len(result_list)
+    row["latency_mean"] = float(np.mean(latency_list))
+    for q in [50, 95, 99]:
+        row[f"latency_p{q}"] = float(np.percentile(latency_list, q))
+    return row
+
+
+# benchmark the search over the grid
+# input:
+# the cell list, the paths of the star images, the directory of the database
+# output:
+# the rows of the cells, the throughput (trials per second) of the whole run
+def benchmark(cell_list, filepaths, database_dir, para, num_workers=1):
+    result_dict = {i_cell: [] for i_cell in range(len(cell_list))}
+    latency_dict = {i_cell: [] for i_cell in range(len(cell_list))}
+    tasks = gen_tasks(cell_list, filepaths)
+
+    time_start = time.perf_counter()
+    if num_workers > 1:
+        with worker_pool(database_dir, para, None, num_workers) as pool:
+            for i_cell, result, latency in pool.imap(
+                run_trial_worker, tasks, chunksize=4
+            ):
+                result_dict[i_cell].append(result)
+                latency_dict[i_cell].append(latency)
+    else:
+        database = load_database(database_dir)
+        for task in tasks:
+            i_cell, result, latency = run_trial(task, database, para)
+            result_dict[i_cell].append(result)
+            latency_dict[i_cell].append(latency)
+    time_total = time.perf_counter() - time_start
+
+    row_list = []
+    for i_cell, cell in enumerate(cell_list):
+        row = summarize_cell(cell, result_dict[i_cell], latency_dict[i_cell])
+        print(
+            f"std_position: {row['std_position']}, num_lost: {row['num_lost']}, "
+            f"num_false: {row['num_false']}, num_trials: {row['num_trials']}, "
+            f"Accuracy: {row['accuracy']}, Failure Rate: {row['failure_rate']}, "
+            f"Latency p50/p95/p99: {row['latency_p50']:.2f}/"
+            f"{row['latency_p95']:.2f}/{row['latency_p99']:.2f} ms"
+        )
+        row_list.append(row)
+    num_trials = sum(cell["num_trials"] for cell in cell_list)
+    throughput = num_trials / time_total
+    print(f"Throughput: {throughput:.2f} trials/s with {num_workers} workers")
+    return row_list, throughput
+
+
+def save_benchmark(row_list, throughput, num_workers, output_dir):
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, "benchmark.csv"), "w", newline="") as fw:
+        writer = csv.DictWriter(fw, fieldnames=benchmark_keys)
+        writer.writeheader()
+        writer.writerows(row_list)
+    with open(os.path.join(output_dir, "benchmark.json"), "w") as fw:
+        # the accuracy of a cell without any match is nan, which is saved as null
+        json.dump(
+            replace_nonfinite(
+                {"workers": num_workers, "throughput": throughput, "cells": row_list}
+            ),
+            fw,
+            indent=4,
+            allow_nan=False,
+        )
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+
+    # the same parameters as search.py
+    para = gen_para()
+    database_dir, filepaths = locate_search_inputs(para)
+
+    cell_list = gen_grid(args, len(filepaths))
+    row_list, throughput = benchmark(
+        cell_list, filepaths, database_dir, para, args.workers
+    )
+    save_benchmark(row_list, throughput, args.workers, args.output_dir)
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+This code is used to sort the stars of SAO by VM (Visual Magnitude) & save them
+as 'sao_VM_sorted.npz', so the stars whose VM is less than any VM_thre (Visual
+Magnitude Threshold) are selected by a prefix slice, see select_VM.
+
+Note that for data accuracy, the angles in file 'sao' & 'sao_VM_sorted.npz' have
+the unit of rad. The RA(RightAscension) & Dec(Declination) also have the unit
+of rad. Other angles all have the unit of deg.
+
+Written in 2026.10.18, which replaces tools/convert_SAO_to_txt.py (revised in
+1/27/2020 by YouZhiyuan) that saved a txt file of the stars for every VM_thre.
+"""
+
+import matplotlib.pyplot as plt
+import os
+from mpl_toolkits.mplot3d import Axes3D
+
+from utils.common.cache_helper import (
+    clear_stage,
+    gen_stage_manifests,
+    is_cached,
+    save_manifest,
+    set_current_manifest,
+)
+from utils.sao_helper import gen_VM_sorted_catalog, read_SAO
+from utils.simulator_helper import save_catalog, select_VM
+
+
+# CN: CatalogNumber
+# VM: VisualMagnitude
+# RA: RightAscension
+# Dec:  Declination
+# vx,vy,vz: unit vector generated by RA & Dec or pixel coordinate
+# _thre: threshold
+# _vis: visualization
+
+
+# generate the catalog of SAO sorted by VM
+# input:
+# the SAO file, the catalog file ('.npz')
+# VM_thre_vis: only the stars whose VM is less than VM_thre_vis are drawn in the
+# visualization, the catalog has all the stars
+def gen_catalog(f_read_name, f_save_name, visualization=True, VM_thre_vis=6.0):
+    # save all the stars in SAO sorted by VM
+    # format:
+    # CN, VM, RA, Dec, v_inertial
+    catalog = gen_VM_sorted_catalog(read_SAO(f_read_name))
+    save_catalog(catalog, f_save_name)
+
+    if visualization:
+        # the unit vector of every star whose VM is less than VM_thre_vis
+        catalog = select_VM(catalog, VM_thre_vis)
+        vx_list, vy_list, vz_list = catalog["v_inertial"].T
+
+        # draw the picture to show the SAO
+        fig = plt.figure()
+        ax = Axes3D(fig)
+        ax.scatter(0, 0, 0, s=10, c="r")
+        ax.scatter(vx_list, vy_list, vz_list, s=4, c="b", alpha=0.4)
+        ax.set_title(f"SAO star catalog with visual magnitude less than {VM_thre_vis}")
+        ax.set_zlabel("Z", fontdict={"size": 15, "color": "red"})
+        ax.set_ylabel("Y", fontdict={"size": 15, "color": "red"})
+        ax.set_xlabel("X", fontdict={"size": 15, "color": "red"})
+        plt.show()
+
+
+if __name__ == "__main__":
+    f_read_name = "./database/sao"
+
+    # the catalog is saved in the directory keyed by the SAO file, every VM_thre
+    # shares it
+    manifest = gen_stage_manifests(dict(), "catalog", f_read_name)["catalog"]
+    if is_cached(manifest):
+        print(f"The catalog is up to date in {manifest['dir']}")
+        # the catalog of this SAO file is the current one again
+        set_current_manifest(manifest)
+    else:
+        # the files of an unfinished catalog are not left
+        clear_stage(manifest)
+        f_save_name = os.path.join(manifest["dir"], "sao_VM_sorted.npz")
+        gen_catalog(f_read_name, f_save_name)
+        save_manifest(manifest)
@@ -1,25 +1,40 @@
 # -*- coding: utf-8 -*-
 """
-This code is used to 
+This code is used to generate the database directly from the catalog: the
+graph & the mst of every main star, then the k-vector of the AD sum in mst.
+
+The neighbor stars of every main star are found in the catalog through the
+SkyIndex, so the star images are not needed. With '--debug', the star image
+(txt & jpg) & the images of R_AD, graph & mst of every main star are also saved.
 
 Written in 2020.04.13, revised in 2022.12.06
 By Zhiyuan You
 """
 
+import argparse
 import cv2
-import glob
-import joblib
+import multiprocessing
 import numpy as np
 import os
 
 from easydict import EasyDict
 
 from utils.database.select_R_AD_helper import select_R_AD
-from utils.database.graph_helper import gen_graph
+from utils.database.graph_helper import gen_graph_catalog
+from utils.common.cache_helper import (
+    check_cached,
+    clear_stage,
+    gen_stage_manifests,
+    is_cached,
+    save_manifest,
+)
 from utils.common.mst_helper import gen_mst
+from utils.common.sky_index_helper import SkyIndex
+from utils.common.star_frame_helper import write_star_frame
 from utils.database.k_vector_helper import gen_k_vertor
-from utils.vis_helper import vis_lines, vis_graph, vis_mst
-
+from utils.database.database_helper import save_database
+from utils.simulator_helper import load_catalog, simulate_one_star
+from utils.vis_helper import vis_frame, vis_graph, vis_mst
 
 # CN: Catalog Number
 # VM: Visual Magnitude
@@ -35,49 +50,117 @@ from utils.vis_helper import vis_lines, vis_graph, vis_mst
 # _2s: double star
 
 
-def gen_database(filepaths, para, visualization=True):
-    graph_list = []
-    for filepath in filepaths:
-        with open(filepath) as fr:
-            lines = fr.readlines()
-            CN_ms = lines[0].strip().split()[0]
-        print(f"Handling star {CN_ms}")
-
-        # select R
-        lines_out = select_R_AD(lines, para)
-        if visualization:
-            img_path = os.path.join(database_pic_R_dir, str(CN_ms) + ".jpg")
-            img = vis_lines(lines_out, para)
-            cv2.imwrite(img_path, img)
-        print(f"Successfully select radius AD for {CN_ms}")
-
-        # generate graph
-        graph, CN_list, XY_list = gen_graph(lines_out)
-        if visualization:
-            img = vis_graph(CN_list, XY_list, para)
-            img_path = os.path.join(database_pic_graph_dir, str(CN_ms) + ".jpg")
-            cv2.imwrite(img_path, img)
-        print(f"Successfully generate graph for {CN_ms}")
-
-        # generate mst
-        graph, mst = gen_mst(graph)
-        graph_list.append(graph)
-        if visualization:
-            img = vis_mst(mst, XY_list, para)
-            img_path = os.path.join(database_pic_mst_dir, str(CN_ms) + ".jpg")
-            cv2.imwrite(img_path, img)
-        print(f"Successfully generate mst for {CN_ms}")
-
-    # sort & save graph_list
-    graph_list = sorted(graph_list, key=lambda e: e["AD_sum_mst"])
-    joblib.dump(graph_list, "./database/graph_list.pkl")
+parser = argparse.ArgumentParser(description="Database Setting")
+parser.add_argument("--workers", type=int, default=1)
+parser.add_argument("--debug", action="store_true")
+
+
+# the catalog of a worker process, which is set once by init_worker
+worker_context = dict()
+
+
+# save the star image & the images of R_AD, graph & mst of the main star
+# input:
+# the catalog & its SkyIndex, the index of the main star, the mst of the graph
+# debug_dirs: the directories of the txt files & the images
+def save_debug_output(catalog, i_ms, mst, para, sky_index, debug_dirs):
+    CN_ms = catalog["CN"][i_ms]
+    frame = simulate_one_star(catalog, i_ms, para, sky_index)
+    txt_path = os.path.join(debug_dirs["txt"], str(CN_ms) + ".txt")
+    write_star_frame(frame, txt_path)
+    img_path = os.path.join(debug_dirs["image"], str(CN_ms) + ".jpg")
+    cv2.imwrite(img_path, vis_frame(frame, para))
+
+    # select R
+    frame = select_R_AD(frame, para)
+    img_path = os.path.join(debug_dirs["R"], str(CN_ms) + ".jpg")
+    cv2.imwrite(img_path, vis_frame(frame, para))
+
+    # graph & mst
+    img_path = os.path.join(debug_dirs["graph"], str(CN_ms) + ".jpg")
+    cv2.imwrite(img_path, vis_graph(frame, para))
+    img_path = os.path.join(debug_dirs["mst"], str(CN_ms) + ".jpg")
+    cv2.imwrite(img_path, vis_mst(mst, frame, para))
+
+
+# generate the graph of one main star
+# input:
+# the index of the main star in the catalog
+# debug_dirs: see save_debug_output, None: no debug output
+# output:
+# the graph with the AD_sum_mst, None if the main star is a double star
+def gen_star_graph(i_ms, catalog, sky_index, para, debug_dirs=None):
+    CN_ms = catalog["CN"][i_ms]
+    print(f"Handling star {CN_ms}")
+
+    # generate graph
+    graph = gen_graph_catalog(catalog, i_ms, para, sky_index)
+    if graph is None:
+        print(f"Skip the double star {CN_ms}")
+        return None
+
+    # generate mst
+    graph, mst = gen_mst(graph)
+    if debug_dirs is not None:
+        save_debug_output(catalog, i_ms, mst, para, sky_index, debug_dirs)
+    print(f"Successfully generate graph & mst for {CN_ms}")
+    return graph
+
+
+def init_worker(catalog, sky_index, para, debug_dirs):
+    worker_context["catalog"] = catalog
+    worker_context["sky_index"] = sky_index
+    worker_context["para"] = para
+    worker_context["debug_dirs"] = debug_dirs
+
+
+def gen_star_graph_worker(i_ms):
+    return gen_star_graph(
+        i_ms,
+        worker_context["catalog"],
+        worker_context["sky_index"],
+        worker_context["para"],
+        worker_context["debug_dirs"],
+    )
+
+
+# generate & save the database
+# the main stars are handled by num_workers processes if num_workers > 1, the
+# graphs are gathered in the order of the catalog, so the database is the same
+# as the single process run.
+def gen_database(catalog, database_dir, para, debug_dirs=None, num_workers=1):
+    # the index for finding the neighbor stars in R_AD
+    sky_index = SkyIndex(catalog["v_inertial"], zone_AD=para.R_AD)
+
+    i_ms_list = range(len(catalog["CN"]))
+    if num_workers > 1:
+        with multiprocessing.Pool(
+            num_workers,
+            initializer=init_worker,
+            initargs=(catalog, sky_index, para, debug_dirs),
+        ) as pool:
+            graph_list = pool.map(gen_star_graph_worker, i_ms_list, chunksize=16)
+    else:
+        graph_list = [
+            gen_star_graph(i_ms, catalog, sky_index, para, debug_dirs)
+            for i_ms in i_ms_list
+        ]
+    graph_list = [graph for graph in graph_list if graph is not None]
+
+    # sort graph_list by AD_sum_mst, the ties are sorted by the str of CN_ms,
+    # i.e., the name of the txt file of the star image
+    graph_list = sorted(graph_list, key=lambda e: (e["AD_sum_mst"], str(e["CN_ms"])))
 
     # gen k_vector for rough search
     k_vector, q, m = gen_k_vertor(graph_list, para)
-    joblib.dump([k_vector, q, m], "./database/k_vector_q_m.pkl")
+
+    # save the database in the columnar format, see save_database
+    save_database(graph_list, [k_vector, q, m], database_dir, para.database_dtype)
 
 
 if __name__ == "__main__":
+    args = parser.parse_args()
+
     # simulation parameter
     para = EasyDict({})
     para.R_AD = 6  # Radius of angular distance
@@ -101,19 +184,38 @@ if __name__ == "__main__":
     # the relative machine error in k-vector paper
     para.epsilon_machine = 2.22e-16
 
-    # save the image in R_AD
-    database_pic_R_dir = "./database/pic_star_image_R"
-    os.makedirs(database_pic_R_dir, exist_ok=True)
-
-    # save the graph image
-    database_pic_graph_dir = "./database/pic_star_image_graph"
-    os.makedirs(database_pic_graph_dir, exist_ok=True)
-
-    # save the mst image
-    database_pic_mst_dir = "./database/pic_star_image_mst"
-    os.makedirs(database_pic_mst_dir, exist_ok=True)
-
-    database_txt_dir = "./database/txt_star_image"
-    filepaths = glob.glob(os.path.join(database_txt_dir, "*.txt"))
-
-    gen_database(filepaths, para)
+    # the dtype of the adjacency values in the database, "float32" halves the size
+    para.database_dtype = "float64"
+
+    # the database is saved in the directory keyed by the parameters above & the
+    # catalog, see cache_helper
+    manifests = gen_stage_manifests(para, "graph_database")
+    check_cached(manifests["catalog"])
+    manifest = manifests["graph_database"]
+    if is_cached(manifest):
+        print(f"The database is up to date in {manifest['dir']}")
+    else:
+        # the database out of date is generated again from scratch
+        clear_stage(manifest)
+
+        # the debug output: the star images & the images of R_AD, graph & mst
+        debug_dirs = None
+        if args.debug:
+            debug_dirs = {
+                "txt": "txt_star_image",
+                "image": "pic_star_image",
+                "R": "pic_star_image_R",
+                "graph": "pic_star_image_graph",
+                "mst": "pic_star_image_mst",
+            }
+            for key, debug_dir in debug_dirs.items():
+                debug_dirs[key] = os.path.join(manifest["dir"], "debug", debug_dir)
+                os.makedirs(debug_dirs[key], exist_ok=True)
+
+        # read the stars whose VM is less than VM_thre
+        f_sao_name = os.path.join(manifests["catalog"]["dir"], "sao_VM_sorted.npz")
+        catalog = load_catalog(f_sao_name, para.VM_thre)
+
+        database_dir = manifest["dir"]
+        gen_database(catalog, database_dir, para, debug_dirs, args.workers)
+        save_manifest(manifest)
@@ -1,9 +1,9 @@
 # -*- coding: utf-8 -*-
 """
-This code is used to search the best match between the test graph & the databse 
-graph. The graph match algorithm is relatively slow so far. However, it is very 
-important that it is not a single star match or a pattern match, when the graph 
-match is done, every star in the graph is matched with the database. 
+This code is used to search the best match between the test graph & the databse
+graph. The graph match algorithm is relatively slow so far. However, it is very
+important that it is not a single star match or a pattern match, when the graph
+match is done, every star in the graph is matched with the database.
 
 Written in 2020.01.26, revised in 2022.12.06
 by Zhiyuan You
@@ -11,19 +11,33 @@ by Zhiyuan You
 
 
 import argparse
+import contextlib
 import glob
-import numpy as np
-import joblib
+import multiprocessing
 import os
+import sys
 
 from easydict import EasyDict
 
 from utils.search.select_R_AD_helper import select_R_AD
 from utils.search.graph_helper import gen_graph
+from utils.common.cache_helper import check_cached, gen_stage_manifests
 from utils.common.mst_helper import gen_mst
-from utils.search.k_vector_helper import search_k_vector
-from utils.search.match_helper import match_graph
-from utils.noise_helper import add_noise
+from utils.common.profile_helper import (
+    Profiler,
+    null_profiler,
+    print_summary,
+    save_profile,
+    summarize_records,
+)
+from utils.common.star_frame_helper import read_star_frame
+from utils.database.database_helper import (
+    attach_database,
+    load_database,
+    share_database,
+)
+from utils.search.search_helper import gen_epsilon_AD_list, search_graph
+from utils.noise_helper import add_noise, gen_trial_rng
 
 
 # CN: CatalogNumber
@@ -44,75 +58,134 @@ parser = argparse.ArgumentParser(description="Noise Setting")
 parser.add_argument("--std_position", type=float, default=0)
 parser.add_argument("--num_lost", type=int, default=0)
 parser.add_argument("--num_false", type=int, default=0)
+parser.add_argument("--workers", type=int, default=1)
+# the per-stage latency of every query, see profile_helper
+parser.add_argument("--profile", action="store_true")
+parser.add_argument("--profile_dir", type=str, default="./results/profile")
 
 
-def search(filepaths, k_vector_q_m, graph_list, para, args, visualization=False):
-    num_fail = 0
-    num_right = 0
-    num_wrong = 0
+# the database of a worker process, which is loaded once by init_worker
+worker_context = dict()
 
-    k_vector, q, m = k_vector_q_m
 
-    for filepath in filepaths:
-        with open(filepath) as fr:
-            lines = fr.readlines()
-        CN_ms = int(lines[0].strip().split()[0])
-        print(f"Handling star {CN_ms}")
+# identify the main star of one star image
+# input:
+# the index & the path of the star image, the index seeds the noise so that the
+# result does not depend on the process that handles the star image, see
+# gen_trial_rng.
+# the Profiler of the query, see profile_helper
+# output:
+# the CN of the main star, the CN of the matched main star (None if no match),
+# the match error
+def identify(i_file, filepath, database, para, args, profiler=null_profiler):
+    with profiler.stage("read_star_frame"):
+        frame = read_star_frame(filepath)
+    CN_ms = int(frame["CN"][0])
 
-        # add noise
-        lines = add_noise(lines, args, para)
-        # select R
-        lines_out = select_R_AD(lines, para)
-        # generate graph
-        graph = gen_graph(lines_out, para)
-        # generate mst
+    # add noise
+    with profiler.stage("add_noise"):
+        frame = add_noise(frame, args, para, gen_trial_rng(para.seed, i_file))
+    # select R
+    with profiler.stage("select_R_AD"):
+        frame = select_R_AD(frame, para)
+    # generate graph
+    with profiler.stage("gen_graph"):
+        graph = gen_graph(frame, para)
+    # generate mst
+    with profiler.stage("gen_mst"):
         graph, _ = gen_mst(graph)
 
-        # rough search
-        i_interval_start = None
-        i_interval_end = None
-        for epsilon_AD in para.epsilon_AD_list:
-            i_start, i_end = search_k_vector(
-                graph["AD_sum_mst"], k_vector, q, m, epsilon_AD
-            )
-            if i_interval_start == None or i_interval_end == None:
-                assert i_interval_start == i_interval_end
-                i_graph_list = range(i_start, i_end + 1)
-            else:
-                i_graph_list = list(range(i_start, i_interval_start)) + list(
-                    range(i_interval_end + 1, i_end + 1)
-                )
-            i_interval_start, i_interval_end = i_start, i_end
-
-            # graph match
-            min_error = float("inf")
-            for i_graph in i_graph_list:
-                graph_candidata = graph_list[i_graph]
-
-                # load 2 graph's adjacency matrix for match
-                M_adj_g1 = graph["M_adj"]
-                M_adj_g2 = graph_candidata["M_adj"]
-
-                num_star1 = M_adj_g1.shape[0]
-                num_star2 = M_adj_g2.shape[0]
-                if abs(num_star1 - num_star2) > int(0.2 * num_star2):
-                    continue
-
-                error = match_graph(M_adj_g1, M_adj_g2, para)
-
-                if error < min_error:
-                    i_target = i_graph
-                    min_error = error
-
-            CN_ms_candidat = int(graph_list[i_target]["CN_ms"])
-            # if the min_error is smaller than the epsilon_error, the search is done.
-            # else, continue to search.
-            if min_error <= para.epsilon_error:
-                break
-
-        if min_error > para.epsilon_error:
+    # rough search through the expanding window & graph match
+    with profiler.stage("search_graph"):
+        i_target, min_error = search_graph(graph, database, para, profiler)
+
+    if i_target is None:
+        return CN_ms, None, min_error
+    return CN_ms, int(database.CN_ms[i_target]), min_error
+
+
+# identify the main star of one star image with the profiler
+# output:
+# the result of identify
+# the record of the query (see Profiler.record), None if the profiler is disabled
+def identify_profile(i_file, filepath, database, para, args, profiler):
+    if not profiler.enabled:
+        return identify(i_file, filepath, database, para, args), None
+
+    profiler.reset()
+    with profiler.stage("identify"):
+        result = identify(i_file, filepath, database, para, args, profiler)
+    record = profiler.record()
+    record["i_file"] = i_file
+    record["filepath"] = filepath
+    record["CN_ms"], record["CN_ms_candidat"], record["min_error"] = result
+    return result, record
+
+
+# the workers attach the database in the shared memory if database_desc is given,
+# otherwise they memory-map the database files. Both are shared by the workers.
+def init_worker(database_dir, database_desc, para, args):
+    if database_desc is None:
+        worker_context["database"] = load_database(database_dir)
+    else:
+        worker_context["database"] = attach_database(database_desc)
+    worker_context["para"] = para
+    worker_context["args"] = args
+    worker_context["profiler"] = Profiler(getattr(args, "profile", False))
+
+
+def identify_worker(task):
+    i_file, filepath = task
+    return identify_profile(
+        i_file,
+        filepath,
+        worker_context["database"],
+        worker_context["para"],
+        worker_context["args"],
+        worker_context["profiler"],
+    )
+
+
+# the results of identify_profile without the records, which are appended to
+# record_list
+def collect_records(results, record_list):
+    for result, record in results:
+        if record is not None:
+            record_list.append(record)
+        yield result
+
+
+# print & save the summary of the records, if the profiler is enabled
+def finish_profile(record_list, args):
+    if not getattr(args, "profile", False):
+        return
+    summary = summarize_records(record_list)
+    print_summary(summary)
+    save_profile(record_list, summary, args.profile_dir)
+
+
+# the result of one star image, 'right', 'wrong' or 'fail' (the match error is
+# larger than epsilon_error)
+def judge_result(CN_ms, CN_ms_candidat, min_error, para):
+    if min_error > para.epsilon_error:
+        return "fail"
+    elif CN_ms == CN_ms_candidat:
+        return "right"
+    return "wrong"
+
+
+# count the right, wrong & fail results in the order of the star images
+def count_results(results, para):
+    num_fail = 0
+    num_right = 0
+    num_wrong = 0
+
+    for CN_ms, CN_ms_candidat, min_error in results:
+        print(f"Handling star {CN_ms}")
+        result = judge_result(CN_ms, CN_ms_candidat, min_error, para)
+        if result == "fail":
             num_fail += 1
-        elif CN_ms == CN_ms_candidat:
+        elif result == "right":
             num_right += 1
         else:
             num_wrong += 1
@@ -121,11 +194,60 @@ def search(filepaths, k_vector_q_m, graph_list, para, args, visualization=False)
     acc = num_right / (num_right + num_wrong)
     fail_rate = num_fail / (num_fail + num_right + num_wrong)
     print(f"Accuracy: {acc}, Failure Rate: {fail_rate}")
+    return num_right, num_wrong, num_fail
 
 
-if __name__ == "__main__":
-    args = parser.parse_args()
+def search(filepaths, database, para, args, visualization=False):
+    profiler = Profiler(getattr(args, "profile", False))
+    record_list = []
+    results = (
+        identify_profile(i_file, filepath, database, para, args, profiler)
+        for i_file, filepath in enumerate(filepaths)
+    )
+    counts = count_results(collect_records(results, record_list), para)
+    finish_profile(record_list, args)
+    return counts
+
+
+# the pool of num_workers processes, which have the database & the parameters.
+# if para.database_share is 'shared_memory', the database is published to the
+# shared memory once, otherwise ('mmap') every worker memory-maps the database.
+@contextlib.contextmanager
+def worker_pool(database_dir, para, args, num_workers):
+    shm_list = []
+    database_desc = None
+    if para.get("database_share", "mmap") == "shared_memory":
+        if sys.version_info >= (3, 8):
+            shm_list, database_desc = share_database(load_database(database_dir))
+        else:
+            print("multiprocessing.shared_memory needs python >= 3.8, use mmap")
+
+    try:
+        with multiprocessing.Pool(
+            num_workers,
+            initializer=init_worker,
+            initargs=(database_dir, database_desc, para, args),
+        ) as pool:
+            yield pool
+    finally:
+        for shm in shm_list:
+            shm.close()
+            shm.unlink()
 
+
+# the same as search, but the star images are handled by num_workers processes,
+# see worker_pool.
+def search_parallel(filepaths, database_dir, para, args, num_workers):
+    record_list = []
+    with worker_pool(database_dir, para, args, num_workers) as pool:
+        results = pool.imap(identify_worker, enumerate(filepaths), chunksize=4)
+        counts = count_results(collect_records(results, record_list), para)
+    finish_profile(record_list, args)
+    return counts
+
+
+# the parameters of the search
+def gen_para():
     # simulation parameter
     para = EasyDict({})
     # hyper parameter
@@ -133,10 +255,31 @@ if __name__ == "__main__":
     # about (0,12), the difference need to be adjusted. Redefine difference:
     # 1/exp(times_sub_AD*abs(AD1-AD2)).
     para.times_sub_AD = 1.74
+    # the solver of the principal eigenvector of the affinity matrix,
+    # 'eig' is the reference mode, 'eigh' & 'power' are faster.
+    para.eig_mode = "power"
+    # the convergence tolerance & the iteration cap of the power iteration
+    para.eig_tol = 1e-10
+    para.eig_max_iter = 1000
+    # the affinity matrix costs (num_g1 * num_g2)^2 * 8 bytes, it is only not
+    # materialized if it costs more than affi_max_bytes, see select_affi_mode.
+    para.affi_mode = "auto"
+    para.affi_max_bytes = 256 * 2**20
+    # the number of candidate graphs matched before the error is checked, a smaller
+    # batch stops earlier, see search_graph.
+    para.match_batch_size = 16
+    # whether the candidates of the same size are matched together, which is only
+    # faster for graphs of about 10 stars or less, see match_graph_batch.
+    para.match_batch = False
+    # the discretization of the principal eigenvector, 'greedy' or 'hungarian'
+    para.discrete_mode = "greedy"
     # Radius of AD that generate a graph
     para.R_AD = 6
-    # the AD uncertainty during the process of rough search through k-vector
-    para.epsilon_AD_list = np.linspace(0.1, 6, 500)
+    # the AD uncertainty during the process of rough search through k-vector,
+    # the window is doubled from 0.1 to 6, see search_graph.
+    para.epsilon_AD_list = gen_epsilon_AD_list(0.1, 6)
+    # the number of the best matches noted in the profile of a query (--profile)
+    para.num_top = 5
     # the error threshold
     para.epsilon_error = 0.4
     para.FOV_x = 20  # FOV
@@ -147,6 +290,11 @@ if __name__ == "__main__":
     para.R_max = 5
     para.Color = (255, 255, 255)
 
+    # the parameters of the database, which locate the database, see cache_helper
+    para.AD_2s_thre = 0.19  # AD threshold for 2 star systme
+    para.epsilon_machine = 2.22e-16
+    para.database_dtype = "float64"
+
     # graph
     para.Color_s = (0, 0, 0)
     para.Color_l = (0, 0, 0)
@@ -154,10 +302,36 @@ if __name__ == "__main__":
     para.Wid_s = -1  # -1: filled
     para.R_s = 5  # the graph vextex radius
 
-    database_txt_dir = "./database/txt_star_image"
-    filepaths = glob.glob(os.path.join(database_txt_dir, "*.txt"))
+    # how the workers share the database, 'mmap' or 'shared_memory', which needs
+    # python >= 3.8
+    para.database_share = "mmap"
+
+    # the random seed of the noise, see identify
+    para.seed = 0
+    return para
 
-    k_vector, q, m = joblib.load("./database/k_vector_q_m.pkl")
-    graph_list = joblib.load("./database/graph_list.pkl")
 
-    search(filepaths, [k_vector, q, m], graph_list, para, args)
+# locate the database & the star images of the parameters, see cache_helper
+# output:
+# the directory of the database, the paths of the star images
+def locate_search_inputs(para):
+    manifests = gen_stage_manifests(para, "graph_database")
+    manifests.update(gen_stage_manifests(para, "star_image"))
+    check_cached(manifests["graph_database"])
+    check_cached(manifests["star_image"])
+    database_dir = manifests["graph_database"]["dir"]
+    database_txt_dir = os.path.join(manifests["star_image"]["dir"], "txt_star_image")
+    filepaths = sorted(glob.glob(os.path.join(database_txt_dir, "*.txt")))
+    return database_dir, filepaths
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    para = gen_para()
+    database_dir, filepaths = locate_search_inputs(para)
+
+    if args.workers > 1:
+        search_parallel(filepaths, database_dir, para, args, args.workers)
+    else:
+        database = load_database(database_dir)
+        search(filepaths, database, para, args)
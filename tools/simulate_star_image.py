@@ -1,12 +1,12 @@
 # -*- coding: utf-8 -*-
 """
-This code is used to generate simulation star images through RightAscension & 
+This code is used to generate simulation star images through RightAscension &
 Declination of the stars in FOV of CCD.
 
-The project model of one star is described in 'project_1s' function.
+The project model of the stars is described in 'project_stars' function.
 
-According to the project model, the main star is projected to the center of the 
-image. The neighbor star whose AD (angular distance) with main star is less than 
+According to the project model, the main star is projected to the center of the
+image. The neighbor star whose AD (angular distance) with main star is less than
 FOV_max is project in the image.
 
 Written in 2020.04.13, revised in 2022.12.06
@@ -19,9 +19,17 @@ import os
 
 from easydict import EasyDict
 
-from utils.simulator_helper import simulate_one_star
-from utils.vis_helper import vis_lines
-
+from utils.common.cache_helper import (
+    check_cached,
+    clear_stage,
+    gen_stage_manifests,
+    is_cached,
+    save_manifest,
+)
+from utils.common.sky_index_helper import SkyIndex
+from utils.common.star_frame_helper import write_star_frame
+from utils.simulator_helper import load_catalog, simulate_one_star
+from utils.vis_helper import vis_frame
 
 # CN: Catalog Number
 # VM: Visual Magnitude
@@ -40,24 +48,23 @@ from utils.vis_helper import vis_lines
 def simulate_star_image(
     f_sao_name, database_txt_dir, database_pic_dir, para, visualization=True
 ):
-    # read the SAO database
-    with open(f_sao_name) as fr:
-        lines = fr.readlines()
+    # read the stars whose VM is less than VM_thre
+    catalog = load_catalog(f_sao_name, para.VM_thre)
+    # the index for finding the neighbor stars in FOV_max
+    sky_index = SkyIndex(catalog["v_inertial"], zone_AD=para.FOV_max)
 
-    num_star = len(lines)
+    num_star = len(catalog["CN"])
     for i_ms in range(num_star):
-        CN_ms = lines[i_ms].strip().split()[0]
-        lines_out = simulate_one_star(lines, i_ms, para)
-        if lines_out:
+        CN_ms = catalog["CN"][i_ms]
+        frame = simulate_one_star(catalog, i_ms, para, sky_index)
+        if frame is not None:
             # save generated txt file
             txt_path = os.path.join(database_txt_dir, str(CN_ms) + ".txt")
-            with open(txt_path, "w") as fw:
-                for line in lines_out:
-                    fw.write(line)
+            write_star_frame(frame, txt_path)
             # save generated image
             if visualization:
                 img_path = os.path.join(database_pic_dir, str(CN_ms) + ".jpg")
-                img = vis_lines(lines_out, para)
+                img = vis_frame(frame, para)
                 cv2.imwrite(img_path, img)
                 print(f"Successfully generate txt file and image for {CN_ms}")
             else:
@@ -77,17 +84,28 @@ if __name__ == "__main__":
     para.R_max = 5
     para.Color = (255, 255, 255)
 
-    f_sao_name = f"./database/sao_VM_thre{para.VM_thre}.txt"
-
-    # create database pic dir to save simulation image
-    database_pic_dir = "./database/pic_star_image"
-    os.makedirs(database_pic_dir, exist_ok=True)
-
-    # create database txt dir to save simulation txt file
-    # txt format:
-    # 0 row: CN_ms,VM_ms,x_ms,y_ms
-    # other rows: CN_ns,VM_ns,x_ns,y_ns
-    database_txt_dir = "./database/txt_star_image"
-    os.makedirs(database_txt_dir, exist_ok=True)
-
-    simulate_star_image(f_sao_name, database_txt_dir, database_pic_dir, para)
+    # the star images are saved in the directory keyed by the parameters above &
+    # the catalog, see cache_helper
+    manifests = gen_stage_manifests(para, "star_image")
+    check_cached(manifests["catalog"])
+    manifest = manifests["star_image"]
+    if is_cached(manifest):
+        print(f"The star images are up to date in {manifest['dir']}")
+    else:
+        # the star images out of date are generated again from scratch
+        clear_stage(manifest)
+        f_sao_name = os.path.join(manifests["catalog"]["dir"], "sao_VM_sorted.npz")
+
+        # create database pic dir to save simulation image
+        database_pic_dir = os.path.join(manifest["dir"], "pic_star_image")
+        os.makedirs(database_pic_dir, exist_ok=True)
+
+        # create database txt dir to save simulation txt file
+        # txt format:
+        # 0 row: CN_ms,VM_ms,x_ms,y_ms
+        # other rows: CN_ns,VM_ns,x_ns,y_ns
+        database_txt_dir = os.path.join(manifest["dir"], "txt_star_image")
+        os.makedirs(database_txt_dir, exist_ok=True)
+
+        simulate_star_image(f_sao_name, database_txt_dir, database_pic_dir, para)
+        save_manifest(manifest)
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+This code is used to delete some stars from & insert some stars into the star
+catalog, then update the star images & the database incrementally, without
+running simulate_star_image.py & gen_database.py over the whole catalog.
+
+The result is the same as the full rebuild with the updated catalog, see
+utils/database/update_helper.py.
+
+Written in 2026.10.18
+"""
+
+import argparse
+import numpy as np
+import os
+
+from easydict import EasyDict
+
+from utils.common.cache_helper import (
+    check_cached,
+    gen_stage_manifests,
+    load_updates,
+    save_manifest,
+)
+from utils.common.sky_index_helper import SkyIndex
+from utils.common.star_frame_helper import write_star_frame
+from utils.database.database_helper import load_database, save_database_arrays
+from utils.database.update_helper import update_catalog, update_database
+from utils.simulator_helper import (
+    load_catalog,
+    parse_catalog,
+    save_catalog,
+    select_VM,
+)
+
+
+# CN: Catalog Number
+# VM: Visual Magnitude
+# RA: Right Ascension
+# Dec: Declination
+# AD: Angular Distance
+# _ms: main star
+# _thre: threshold
+# _2s: double star
+
+
+parser = argparse.ArgumentParser(description="Catalog Update")
+parser.add_argument("--delete", type=int, nargs="*", default=[])
+# the txt file of the inserted stars, the same format as the catalog
+parser.add_argument("--insert", type=str, default=None)
+
+
+def update_catalog_database(
+    f_sao_name, database_txt_dir, database_dir, CN_delete_list, lines_insert, para
+):
+    # read the SAO database sorted by VM
+    store_old = load_catalog(f_sao_name)
+    catalog_insert = parse_catalog(lines_insert)
+    for CN in CN_delete_list:
+        if CN not in store_old["CN"]:
+            raise ValueError(f"Star {CN} is not in the catalog")
+    for CN in catalog_insert["CN"]:
+        if CN in store_old["CN"] and CN not in CN_delete_list:
+            raise ValueError(f"Star {CN} is already in the catalog")
+
+    # the database only has the stars whose VM is less than VM_thre
+    store_new = update_catalog(store_old, CN_delete_list, catalog_insert)
+    catalog_old = select_VM(store_old, para.VM_thre)
+    catalog_new = select_VM(store_new, para.VM_thre)
+    sky_index_new = SkyIndex(catalog_new["v_inertial"], zone_AD=para.FOV_max)
+    CN_delete_list = [CN for CN in CN_delete_list if CN in catalog_old["CN"]]
+    CN_insert_list = [CN for CN in catalog_insert["CN"] if CN in catalog_new["CN"]]
+
+    # update the database
+    arrays = load_database(database_dir, mmap_mode=None).arrays
+    arrays, frame_dict = update_database(
+        arrays,
+        catalog_old,
+        catalog_new,
+        sky_index_new,
+        CN_delete_list,
+        CN_insert_list,
+        para,
+    )
+    save_database_arrays(arrays, database_dir)
+    print(f"Successfully update the database, {len(arrays['CN_ms'])} graphs")
+
+    # update the star images
+    for CN_ms, frame in frame_dict.items():
+        txt_path = os.path.join(database_txt_dir, str(CN_ms) + ".txt")
+        if frame is not None:
+            write_star_frame(frame, txt_path)
+        elif os.path.exists(txt_path):
+            os.remove(txt_path)
+    print(f"Successfully update {len(frame_dict)} txt files")
+
+    # update the catalog
+    save_catalog(store_new, f_sao_name)
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+
+    # the same parameters as simulate_star_image.py & gen_database.py
+    para = EasyDict({})
+    para.R_AD = 6  # Radius of angular distance
+    para.AD_2s_thre = 0.19  # AD threshold for 2 star systme
+    para.FOV_x = 20  # FOV
+    para.FOV_y = 20
+    para.FOV_max = np.sqrt((para.FOV_x / 2) ** 2 + (para.FOV_y / 2) ** 2)
+    para.N_x = 1024  # resolution
+    para.N_y = 1024
+    para.VM_thre = 6.0
+
+    # the relative machine error in k-vector paper
+    para.epsilon_machine = 2.22e-16
+
+    # the dtype of the adjacency values in the database
+    para.database_dtype = "float64"
+
+    # the catalog, the star images & the database are updated in place, the
+    # updates are recorded in the manifest of the catalog, see cache_helper
+    manifests = gen_stage_manifests(para, "graph_database")
+    manifests.update(gen_stage_manifests(para, "star_image"))
+    for manifest in manifests.values():
+        check_cached(manifest)
+    f_sao_name = os.path.join(manifests["catalog"]["dir"], "sao_VM_sorted.npz")
+    database_txt_dir = os.path.join(manifests["star_image"]["dir"], "txt_star_image")
+    database_dir = manifests["graph_database"]["dir"]
+
+    lines_insert = []
+    if args.insert is not None:
+        with open(args.insert) as fr:
+            lines_insert = fr.readlines()
+
+    update_catalog_database(
+        f_sao_name, database_txt_dir, database_dir, args.delete, lines_insert, para
+    )
+
+    update = {
+        "delete": args.delete,
+        "insert": [int(line.strip().split()[0]) for line in lines_insert],
+    }
+    save_manifest(manifests["catalog"], load_updates(manifests["catalog"]) + [update])
+    # the star images & the database of para are up to date with the catalog, the
+    # ones of the other parameters are out of date & generated again
+    manifests = gen_stage_manifests(para, "graph_database")
+    manifests.update(gen_stage_manifests(para, "star_image"))
+    save_manifest(manifests["star_image"])
+    save_manifest(manifests["graph_database"])
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+This code is used to key the artifacts of the pipeline by their inputs.
+
+The pipeline has 3 stages, each of which is saved in its own directory:
+    catalog: tools/gen_catalog.py, the stars of SAO sorted by VM
+    star_image: tools/simulate_star_image.py, the simulated star images for
+        the search, which depends on the catalog
+    graph_database: tools/gen_database.py, the graphs, mst & k-vector, which
+        depends on the catalog
+The directory of a stage is './database/{stage}_{fingerprint}', the fingerprint
+is the hash of the parameters of the stage, the fingerprints of its upstream
+stages & the content of the SAO file. So a stage is only generated again when
+its own parameters or its upstream stages change, e.g., changing R_AD only
+generates the graph_database again.
+
+A stage is done when its 'manifest.json' is saved, which records the
+parameters & the fingerprints. An unfinished stage has no manifest, so it is
+generated again.
+
+The catalog can be updated in place (tools/update_database.py), the updates are
+recorded in the manifest of the catalog. A downstream stage records the updates
+of its upstream stages when it is done ('dep_updates'), so a downstream stage
+with other parameters, which is not updated together with the catalog, is out
+of date & generated again. The updates do not change the fingerprints.
+
+Only the catalog stage reads the SAO file, when it is generated
+(tools/gen_catalog.py). The catalog generated last is recorded in
+'{database_root}/catalog_current.json', & the downstream stages are keyed by its
+saved manifest, so the star images & the database are found & generated without
+the SAO file. After the SAO file changes, tools/gen_catalog.py must be run again.
+
+The SHA1 of the SAO file is cached in '{database_root}/hash_cache.json' with
+the size & the modification time of the file, so the file is only read again
+when it changes. The cache is in the directory of the artifacts, not beside the
+input file, which may be read-only.
+
+Written in 2026.10.18
+"""
+
+
+import hashlib
+import json
+import os
+import shutil
+
+
+# the parameters that every stage depends on
+stage_keys = {
+    "catalog": [],
+    "star_image": ["VM_thre", "AD_2s_thre", "FOV_x", "FOV_y", "N_x", "N_y"],
+    "graph_database": [
+        "VM_thre",
+        "R_AD",
+        "AD_2s_thre",
+        "FOV_x",
+        "FOV_y",
+        "N_x",
+        "N_y",
+        "epsilon_machine",
+        "database_dtype",
+    ],
+}
+# the upstream stages of every stage, in the order of the pipeline
+stage_deps = {
+    "catalog": [],
+    "star_image": ["catalog"],
+    "graph_database": ["catalog"],
+}
+
+
+# the hash of the content of a file
+# input:
+# the file, the directory of the hash cache, None: no cache
+# output:
+# the SHA1 of the file, which is cached with the size & the modification time
+def hash_file(filepath, cache_dir=None):
+    stat = os.stat(filepath)
+    key = os.path.abspath(filepath)
+    file_info = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    cache = dict()
+    if cache_dir is not None:
+        f_cache_name = os.path.join(cache_dir, "hash_cache.json")
+        if os.path.exists(f_cache_name):
+            with open(f_cache_name) as fr:
+                cache = json.load(fr)
+        cached = cache.get(key)
+        if cached is not None and cached["file_info"] == file_info:
+            return cached["sha1"]
+
+    sha1 = hashlib.sha1()
+    with open(filepath, "rb") as fr:
+        for chunk in iter(lambda: fr.read(1 << 20), b""):
+            sha1.update(chunk)
+    sha1 = sha1.hexdigest()
+
+    if cache_dir is not None:
+        cache[key] = {"file_info": file_info, "sha1": sha1}
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(f_cache_name, "w") as fw:
+            json.dump(cache, fw, indent=4, sort_keys=True)
+    return sha1
+
+
+def gen_fingerprint(obj):
+    text = json.dumps(obj, sort_keys=True)
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+# generate the manifests of a stage & its upstream stages
+# input:
+# the parameters, which contain the keys of the stages
+# the stage, the root directory of the artifacts
+# the SAO file to generate the catalog from, None: the catalog generated last,
+# see load_current_manifest
+# output:
+# the manifests, {stage: manifest}, the manifest is a dict with the key-value:
+# 'stage', 'para', 'deps' (the fingerprints of the upstream stages), 'inputs'
+# (the hash of the SAO file), 'fingerprint', 'dir' & 'dep_updates' (the updates
+# of the upstream stages, see load_updates)
+def gen_stage_manifests(para, stage, f_read_name=None, database_root="./database"):
+    manifests = dict()
+    for dep in stage_deps[stage]:
+        manifests.update(gen_stage_manifests(para, dep, f_read_name, database_root))
+    if not stage_deps[stage] and f_read_name is None:
+        manifests[stage] = load_current_manifest(stage, database_root)
+        return manifests
+
+    manifest = {
+        "stage": stage,
+        "para": {key: para[key] for key in stage_keys[stage]},
+        "deps": {dep: manifests[dep]["fingerprint"] for dep in stage_deps[stage]},
+        "inputs": dict(),
+    }
+    if not stage_deps[stage]:
+        manifest["inputs"][os.path.basename(f_read_name)] = hash_file(
+            f_read_name, database_root
+        )
+    manifest["fingerprint"] = gen_fingerprint(manifest)
+    manifest["dir"] = os.path.join(database_root, f"{stage}_{manifest['fingerprint']}")
+    manifest["dep_updates"] = {
+        dep: load_updates(manifests[dep]) for dep in stage_deps[stage]
+    }
+    manifests[stage] = manifest
+    return manifests
+
+
+def load_manifest(manifest):
+    f_manifest = os.path.join(manifest["dir"], "manifest.json")
+    if not os.path.exists(f_manifest):
+        return None
+    with open(f_manifest) as fr:
+        return json.load(fr)
+
+
+# the manifest of the stage without upstream stages (the catalog) generated last,
+# which is recorded by set_current_manifest, so the SAO file is not needed
+def load_current_manifest(stage, database_root):
+    f_current = os.path.join(database_root, f"{stage}_current.json")
+    manifest_saved = None
+    if os.path.exists(f_current):
+        with open(f_current) as fr:
+            fingerprint = json.load(fr)["fingerprint"]
+        manifest = {"dir": os.path.join(database_root, f"{stage}_{fingerprint}")}
+        manifest_saved = load_manifest(manifest)
+    if manifest_saved is None:
+        raise FileNotFoundError(
+            f"The stage {stage} is not generated in {database_root}, run "
+            f"tools/gen_{stage}.py first"
+        )
+    # the updates are loaded by load_updates
+    manifest_saved.pop("updates", None)
+    manifest_saved["dir"] = manifest["dir"]
+    return manifest_saved
+
+
+# the updates of the stage after it is done, [] if it is not done
+def load_updates(manifest):
+    manifest_saved = load_manifest(manifest)
+    if manifest_saved is None:
+        return []
+    return manifest_saved.get("updates", [])
+
+
+# whether the stage is done with the same fingerprint & the same updates of the
+# upstream stages, i.e., it is not out of date
+def is_cached(manifest):
+    manifest_saved = load_manifest(manifest)
+    if manifest_saved is None:
+        return False
+    dep_updates = {dep: [] for dep in manifest["dep_updates"]}
+    return (
+        manifest_saved["fingerprint"] == manifest["fingerprint"]
+        and manifest_saved.get("dep_updates", dep_updates) == manifest["dep_updates"]
+    )
+
+
+# save the manifest when the stage is done, a stage without upstream stages is
+# also recorded as the current one, see set_current_manifest
+# updates: the incremental updates after the stage is done, see update_database
+def save_manifest(manifest, updates=None):
+    manifest = dict(manifest)
+    if updates is not None:
+        manifest["updates"] = updates
+    os.makedirs(manifest["dir"], exist_ok=True)
+    with open(os.path.join(manifest["dir"], "manifest.json"), "w") as fw:
+        json.dump(manifest, fw, indent=4, sort_keys=True)
+    if not stage_deps[manifest["stage"]]:
+        set_current_manifest(manifest)
+
+
+# record the stage without upstream stages (the catalog) as the current one, which
+# the downstream stages use, see load_current_manifest
+def set_current_manifest(manifest):
+    database_root = os.path.dirname(manifest["dir"])
+    f_current = os.path.join(database_root, f"{manifest['stage']}_current.json")
+    with open(f_current, "w") as fw:
+        json.dump({"fingerprint": manifest["fingerprint"]}, fw, indent=4)
+
+
+# clear the directory of the stage before it is generated (again), so that the
+# files of the deleted stars are not left
+def clear_stage(manifest):
+    shutil.rmtree(manifest["dir"], ignore_errors=True)
+    os.makedirs(manifest["dir"])
+
+
+# the stage must be done before the downstream stages use it
+def check_cached(manifest):
+    if not is_cached(manifest):
+        raise FileNotFoundError(
+            f"The stage {manifest['stage']} is not generated with the parameters "
+            f"{manifest['para']} or is out of date after the updates of the "
+            f"catalog, expected in {manifest['dir']}"
+        )
@@ -2,16 +2,20 @@
 """
 This code is used to generate the mst(minimum spanning tree) of the graph.
 
-For a complete graph, the mst is a subgraph which keeps many attributes of 
-the origin graph and has ability to resist some noise. Therefore, the mst is 
-generated for a rough search. That's why the sum of the AD(angular distance) 
+For a complete graph, the mst is a subgraph which keeps many attributes of
+the origin graph and has ability to resist some noise. Therefore, the mst is
+generated for a rough search. That's why the sum of the AD(angular distance)
 in the mst is calculated.
 
 Written in 2020.01.26, revised in 2022.12.06
 by Zhiyuan You
+Revised in 2026.10.18: the dense Prim algorithm & the mst_mode
 """
 
 
+import numpy as np
+
+
 # CN: CatalogNumber
 # VM: VisualMagnitude
 # RA: RightAscension
@@ -20,7 +24,8 @@ by Zhiyuan You
 # vx,vy,vz: unit vector generated by RA & Dec or pixel coordinate
 # x,y: the project coordinate
 # M: matrix
-# mst: minimum spanning tree(only in this code, in other code may mean maximum spanning tree)
+# mst: minimum spanning tree(only in this code, in other code may mean maximum
+# spanning tree)
 # R: Radius
 # Wid: width
 # _adj: adjacency
@@ -32,41 +37,87 @@ by Zhiyuan You
 # _thre: threshold
 
 
-def gen_mst(graph):
+# generate the mst of the graph & the sum of the AD in the mst
+# input:
+# the graph with the adjacency matrix M_adj
+# mst_mode: 'prim' or 'kruskal', both return the same mst
+# output:
+# the graph with the AD_sum_mst, the edge list of the mst
+# format of the edge:
+# edge weight(AD_s1_s2), vertex1(s1), vertex2(s2), s1 < s2
+# the edges are in the ascending order of (AD_s1_s2, s1, s2)
+def gen_mst(graph, mst_mode="prim"):
     M_adj = graph["M_adj"]
     num_star = M_adj.shape[0]
+    i_s1_list, i_s2_list = np.triu_indices(num_star, 1)
+    assert np.all(M_adj[i_s1_list, i_s2_list] >= 0)
 
-    # Kruskal algorithm to generate the minimum spanning tree
-    # generate the edge list
-    # format:
-    # edge weight(AD_s1_s2), vertex1(s1), vertex2(s2)
-    edge_list = []
-    for i_s1 in range(num_star):
-        for i_s2 in range(i_s1 + 1, num_star):
-            AD_s1_s2 = M_adj[i_s1][i_s2]
-            assert AD_s1_s2 >= 0
-            edge_list.append((AD_s1_s2, i_s1, i_s2))
-    # sort the edge according to the AD
-    edge_list.sort(key=lambda edge: edge[0])
-    # construct the subgraph list, originally, each vertex is a graph
-    subgraph_list = [[i] for i in range(num_star)]
+    if mst_mode == "prim":
+        mst = gen_mst_prim(M_adj)
+    elif mst_mode == "kruskal":
+        mst = gen_mst_kruskal(M_adj)
+    else:
+        raise ValueError(f"Unknown mst_mode: {mst_mode}")
+    # sort the edge according to the AD, the same order as Kruskal algorithm
+    mst.sort()
+
+    AD_sum_mst = sum([edge_mst[0] for edge_mst in mst])
+    graph["AD_sum_mst"] = AD_sum_mst
+    return graph, mst
+
+
+# Prim algorithm on the dense complete graph, O(V^2)
+def gen_mst_prim(M_adj):
+    num_star = M_adj.shape[0]
+    # the vertexes in the mst, originally, only the 0th vertex
+    in_mst = np.zeros(num_star, dtype=bool)
+    in_mst[0] = True
+    # the minimum AD between every vertex & the mst, and the vertex in the mst
+    min_AD = M_adj[0].copy()
+    i_nearest = np.zeros(num_star, dtype=int)
 
-    # generate the mst
     mst = []
-    for edge in edge_list:
-        for i_sub in range(len(subgraph_list)):
-            if edge[1] in subgraph_list[i_sub]:
-                i_sub1 = i_sub
-            if edge[2] in subgraph_list[i_sub]:
-                i_sub2 = i_sub
+    for _ in range(num_star - 1):
+        i_s = int(np.argmin(np.where(in_mst, float("inf"), min_AD)))
+        i_s_mst = int(i_nearest[i_s])
+        mst.append((M_adj[i_s_mst][i_s], min(i_s, i_s_mst), max(i_s, i_s_mst)))
+
+        # update the minimum AD with the new vertex
+        in_mst[i_s] = True
+        closer = M_adj[i_s] < min_AD
+        min_AD[closer] = M_adj[i_s][closer]
+        i_nearest[closer] = i_s
+    return mst
 
+
+# Kruskal algorithm with the union-find of the subgraphs
+def gen_mst_kruskal(M_adj):
+    num_star = M_adj.shape[0]
+    # generate the edge list, sort the edge according to the AD
+    i_s1_list, i_s2_list = np.triu_indices(num_star, 1)
+    AD_list = M_adj[i_s1_list, i_s2_list]
+    i_sort = np.argsort(AD_list, kind="stable")
+
+    # the root of the subgraph of every vertex, originally, each vertex is a graph
+    i_root = list(range(num_star))
+
+    def find_root(i_s):
+        while i_root[i_s] != i_s:
+            i_root[i_s] = i_root[i_root[i_s]]
+            i_s = i_root[i_s]
+        return i_s
+
+    # generate the mst
+    mst = []
+    for i_edge in i_sort:
+        i_s1 = int(i_s1_list[i_edge])
+        i_s2 = int(i_s2_list[i_edge])
+        i_sub1 = find_root(i_s1)
+        i_sub2 = find_root(i_s2)
         # only when 2 vertex belong to different subgraphs, append.
         if not i_sub1 == i_sub2:
-            mst.append(edge)
-            # update the subgraph list
-            subgraph_list[i_sub1] = subgraph_list[i_sub1] + subgraph_list[i_sub2]
-            subgraph_list[i_sub2] = []
-
-    AD_sum_mst = sum([edge_mst[0] for edge_mst in mst])
-    graph["AD_sum_mst"] = AD_sum_mst
-    return graph, mst
+            mst.append((M_adj[i_s1][i_s2], i_s1, i_s2))
+            i_root[i_sub2] = i_sub1
+            if len(mst) == num_star - 1:
+                break
+    return mst
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+This code is used to measure where the time of a query goes.
+
+A Profiler has the timers & the counters of the stages of one query, e.g.,
+    with profiler.stage("gen_graph"):
+        graph = gen_graph(frame, para)
+    profiler.count("epsilon_step")
+    profiler.note("top_candidates", top_candidates)
+The timer of a stage accumulates the time (ms) & the number of calls. If the
+Profiler is disabled, stage returns a shared empty context & count & note return
+at once, so the instrumented code costs almost nothing. A note keeps a json
+value of the query, e.g., the best matches, which is not summarized.
+
+The record of every query is saved as a line of 'profile.jsonl', & the summary
+of all the queries (summarize_records) is saved as 'profile_summary.json'.
+
+Written in 2026.10.18
+"""
+
+
+import json
+import math
+import numpy as np
+import os
+import time
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+null_stage = _NullStage()
+
+
+class _Stage:
+    def __init__(self, timers, name):
+        self.timers = timers
+        self.name = name
+
+    def __enter__(self):
+        self.time_start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        time_ms = (time.perf_counter() - self.time_start) * 1000
+        timer = self.timers.setdefault(self.name, [0.0, 0])
+        timer[0] += time_ms
+        timer[1] += 1
+        return False
+
+
+class Profiler:
+    # the timers, {stage: [time_ms, num_call]}, the counters, {name: count} & the
+    # notes, {name: value} of the current query, which are cleared by reset
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.reset()
+
+    def reset(self):
+        self.timers = dict()
+        self.counters = dict()
+        self.notes = dict()
+
+    def stage(self, name):
+        if not self.enabled:
+            return null_stage
+        return _Stage(self.timers, name)
+
+    def count(self, name, num=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + num
+
+    def note(self, name, value):
+        if self.enabled:
+            self.notes[name] = value
+
+    # the record of the current query, which can be saved as json
+    def record(self):
+        return {
+            "timers": {
+                name: {"time_ms": time_ms, "calls": num_call}
+                for name, (time_ms, num_call) in self.timers.items()
+            },
+            "counters": dict(self.counters),
+            "notes": dict(self.notes),
+        }
+
+
+# the disabled Profiler, the default of the instrumented functions
+null_profiler = Profiler(enabled=False)
+
+
+# summarize the records of the queries
+# input:
+# the records, see Profiler.record
+# output:
+# the summary, the timers with the total, the mean & the p50/p95/p99 time (ms)
+# per query & the mean calls per query, the counters with the total, the mean &
+# the max per query. A query without a stage or a counter counts as 0.
+def summarize_records(records):
+    num_query = len(records)
+    summary = {"num_query": num_query, "timers": dict(), "counters": dict()}
+    if num_query == 0:
+        return summary
+
+    names = sorted({name for record in records for name in record["timers"]})
+    for name in names:
+        time_ms = np.array(
+            [
+                record["timers"].get(name, {"time_ms": 0.0})["time_ms"]
+                for record in records
+            ]
+        )
+        num_call = [
+            record["timers"].get(name, {"calls": 0})["calls"] for record in records
+        ]
+        summary["timers"][name] = {
+            "total_ms": float(time_ms.sum()),
+            "mean_ms": float(time_ms.mean()),
+            "p50_ms": float(np.percentile(time_ms, 50)),
+            "p95_ms": float(np.percentile(time_ms, 95)),
+            "p99_ms": float(np.percentile(time_ms, 99)),
+            "mean_calls": float(np.mean(num_call)),
+        }
+
+    names = sorted({name for record in records for name in record["counters"]})
+    for name in names:
+        count = np.array([record["counters"].get(name, 0) for record in records])
+        summary["counters"][name] = {
+            "total": int(count.sum()),
+            "mean": float(count.mean()),
+            "max": int(count.max()),
+        }
+    return summary
+
+
+def print_summary(summary):
+    print(f"Profile of {summary['num_query']} queries:")
+    for name, timer in summary["timers"].items():
+        print(
+            f"{name}: mean {timer['mean_ms']:.3f} ms, "
+            f"p50/p95/p99 {timer['p50_ms']:.3f}/{timer['p95_ms']:.3f}/"
+            f"{timer['p99_ms']:.3f} ms, {timer['mean_calls']:.2f} calls"
+        )
+    for name, counter in summary["counters"].items():
+        print(f"{name}: mean {counter['mean']:.2f}, max {counter['max']}")
+
+
+# replace the inf & nan in the dicts & lists by None, which are not valid json,
+# e.g., the min_error of a query without any match is inf
+def replace_nonfinite(value):
+    if isinstance(value, dict):
+        return {key: replace_nonfinite(elem) for key, elem in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [replace_nonfinite(elem) for elem in value]
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+# save the records (one json per line) & the summary, inf & nan are saved as null
+def save_profile(records, summary, profile_dir):
+    os.makedirs(profile_dir, exist_ok=True)
+    with open(os.path.join(profile_dir, "profile.jsonl"), "w") as fw:
+        for record in records:
+            fw.write(json.dumps(replace_nonfinite(record), allow_nan=False) + "\n")
+    with open(os.path.join(profile_dir, "profile_summary.json"), "w") as fw:
+        json.dump(replace_nonfinite(summary), fw, indent=4, allow_nan=False)
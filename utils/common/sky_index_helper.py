@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+This code is used to find the stars around a direction, i.e. the cone query over
+the star catalog, without scanning the whole catalog.
+
+The celestial sphere is divided into zones of Dec (Declination), the stars in
+each zone are sorted by RA (RightAscension). A cone whose radius is R only
+touches the zones in [Dec - R, Dec + R], and in each zone only the stars in
+[RA - dRA, RA + dRA] are checked, where sin(dRA) = sin(R) / cos(Dec).
+
+Building the index is a sort of the catalog (less than 0.1 s for the 260k stars
+of the whole SAO), so it is built from the loaded catalog instead of being saved.
+
+Written in 2026.10.18
+"""
+
+
+import math
+import numpy as np
+
+
+# RA: RightAscension
+# Dec:  Declination
+# AD: angular distance
+# R: Radius
+# vx,vy,vz: unit vector generated by RA & Dec or pixel coordinate
+
+
+deg2rad = math.pi / 180
+rad2deg = 180 / math.pi
+
+
+class SkyIndex:
+    # input:
+    # the unit vectors of the stars, shape: (num_star, 3)
+    # the height of a zone in AD, the best is about the radius of the cone query
+    def __init__(self, v_inertial, zone_AD=5):
+        self.v_inertial = np.asarray(v_inertial, dtype=float)
+        self.zone_AD = zone_AD
+        self.zone_height = zone_AD * deg2rad
+        self.num_zone = int(np.ceil(math.pi / self.zone_height))
+
+        # sort the stars by the zone & then by the RA, the stars in zone i_zone
+        # are i_sort[zone_start[i_zone]:zone_start[i_zone + 1]]
+        RA, Dec = self.gen_RA_Dec(self.v_inertial)
+        i_zone = self.gen_zone(Dec)
+        self.i_sort = np.lexsort((RA, i_zone))
+        self.zone_start = np.searchsorted(
+            i_zone[self.i_sort], np.arange(self.num_zone + 1), side="left"
+        )
+        self.RA_sort = RA[self.i_sort]
+
+    @staticmethod
+    def gen_RA_Dec(v):
+        RA = np.mod(np.arctan2(v[..., 1], v[..., 0]), 2 * math.pi)
+        Dec = np.arcsin(np.clip(v[..., 2], -1, 1))
+        return RA, Dec
+
+    def gen_zone(self, Dec):
+        i_zone = np.floor((Dec + math.pi / 2) / self.zone_height).astype(int)
+        return np.clip(i_zone, 0, self.num_zone - 1)
+
+    # find the stars whose AD with the direction v is not larger than R_AD
+    # input:
+    # the unit vector of the direction, the radius of the cone in AD
+    # output:
+    # the indexes of the stars in the ascending order
+    def query(self, v, R_AD):
+        v = np.asarray(v, dtype=float)
+        RA, Dec = self.gen_RA_Dec(v)
+        # the radius, enlarged a little for numerical errors
+        R = min(R_AD * deg2rad + 1e-9, math.pi)
+
+        # the zones touched by the cone
+        i_zone_min, i_zone_max = self.gen_zone(np.array([Dec - R, Dec + R]))
+        # the RA range of the cone, all the RA if the cone contains a pole
+        if Dec + R >= math.pi / 2 or Dec - R <= -math.pi / 2:
+            RA_range_list = [(0, 2 * math.pi)]
+        else:
+            d_RA = np.arcsin(min(np.sin(R) / np.cos(Dec), 1))
+            RA_min, RA_max = RA - d_RA, RA + d_RA
+            if RA_min < 0:
+                RA_range_list = [(0, RA_max), (RA_min + 2 * math.pi, 2 * math.pi)]
+            elif RA_max > 2 * math.pi:
+                RA_range_list = [(RA_min, 2 * math.pi), (0, RA_max - 2 * math.pi)]
+            else:
+                RA_range_list = [(RA_min, RA_max)]
+
+        i_s_list = []
+        for i_zone in range(i_zone_min, i_zone_max + 1):
+            i_start = self.zone_start[i_zone]
+            i_end = self.zone_start[i_zone + 1]
+            RA_zone = self.RA_sort[i_start:i_end]
+            for RA_min, RA_max in RA_range_list:
+                i_RA_start = i_start + np.searchsorted(RA_zone, RA_min, side="left")
+                i_RA_end = i_start + np.searchsorted(RA_zone, RA_max, side="right")
+                i_s_list.append(self.i_sort[i_RA_start:i_RA_end])
+        i_s = np.concatenate(i_s_list)
+
+        # keep the stars in the cone
+        cos = np.matmul(self.v_inertial[i_s], v)
+        return np.sort(i_s[cos >= np.cos(R)])
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+This code is used to hold the stars of a star image as a star frame.
+
+A star frame is a structured array, every element is a star with the fields
+'CN', 'VM', 'x', 'y', 'RA', 'Dec', the main star is the 0th star. The stages of
+the pipeline (noise, select R_AD, graph & visualization) accept & return star
+frames, so the txt files of the star images are only parsed & formatted when
+they are read & written.
+
+The unknown fields (e.g., 'VM', 'RA', 'Dec' of the stars with noise) are nan,
+the CN of a false star is 0.
+
+Written in 2026.10.18
+"""
+
+
+import numpy as np
+
+
+# CN: CatalogNumber
+# VM: VisualMagnitude
+# RA: RightAscension
+# Dec:  Declination
+# x,y: the project coordinate
+
+
+star_frame_dtype = np.dtype(
+    [
+        ("CN", np.int64),
+        ("VM", np.float64),
+        ("x", np.float64),
+        ("y", np.float64),
+        ("RA", np.float64),
+        ("Dec", np.float64),
+    ]
+)
+
+
+# generate a star frame of num_star stars, the fields are nan & the CNs are 0
+def gen_star_frame(num_star):
+    frame = np.zeros(num_star, dtype=star_frame_dtype)
+    for name in ["VM", "x", "y", "RA", "Dec"]:
+        frame[name] = np.nan
+    return frame
+
+
+# parse the lines of a star image
+# input:
+# lines of the stars, format: CN VM x_pixel y_pixel RA Dec
+# output:
+# the star frame
+def parse_star_frame(lines):
+    data_s = [line.split() for line in lines if line.strip()]
+    assert all(len(data) == 6 for data in data_s)
+    data_s = np.array(data_s, dtype=float).reshape(-1, 6)
+
+    frame = gen_star_frame(len(data_s))
+    for i_field, name in enumerate(star_frame_dtype.names):
+        frame[name] = data_s[:, i_field]
+    return frame
+
+
+# the lines of a star frame, format: CN VM x_pixel y_pixel RA Dec
+def format_star_frame(frame):
+    return [
+        f"{CN} {VM} {x} {y} {RA} {Dec}\n" for CN, VM, x, y, RA, Dec in frame.tolist()
+    ]
+
+
+def read_star_frame(filepath):
+    with open(filepath) as fr:
+        return parse_star_frame(fr.readlines())
+
+
+def write_star_frame(frame, filepath):
+    with open(filepath, "w") as fw:
+        fw.writelines(format_star_frame(frame))
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""
+This code is used to save & load the database in a columnar format.
+
+The database is a directory of '.npy' files:
+    AD_sum_mst.npy: the AD sum in mst of every graph, in the ascending order
+    CN_ms.npy: the CN of the main star of every graph
+    num_star.npy: the number of stars of every graph
+    offset.npy: the offsets of every graph in M_adj_triu.npy, the adjacency
+        values of the ith graph are M_adj_triu[offset[i]:offset[i + 1]]
+    M_adj_triu.npy: the concatenated upper triangles (without the diagonal)
+        of the adjacency matrices, float64 or float32
+    k_vector.npy & q_m.npy: the k-vector & [q,m] for the rough search
+
+Since M_adj is symmetric & its diagonal is 0, the upper triangle keeps all the
+information of a graph. The files are loaded through np.load(mmap_mode='r'), so
+the loading is almost instant & the pages are shared by the processes.
+
+The database can also be published once to the shared memory (share_database),
+then the other processes attach it without copying (attach_database).
+
+Written in 2026.10.18
+"""
+
+
+import functools
+import numpy as np
+import os
+import sys
+
+from utils.database.k_vector_helper import gen_k_vector_AD_sum
+
+
+# CN: CatalogNumber
+# AD: angular distance
+# M: matrix
+# mst: minimum spanning tree
+# _adj: adjacency
+# _ms: main star
+# _triu: upper triangle
+
+
+database_keys = [
+    "AD_sum_mst",
+    "CN_ms",
+    "num_star",
+    "offset",
+    "M_adj_triu",
+    "k_vector",
+    "q_m",
+]
+
+
+# the indexes of the upper triangle (without the diagonal) of a num_star matrix
+@functools.lru_cache(maxsize=None)
+def get_triu_indices(num_star):
+    return np.triu_indices(num_star, 1)
+
+
+class GraphDatabase:
+    # the graphs sorted by AD_sum_mst, the arrays (AD_sum_mst, CN_ms, num_star)
+    # are for the search without rebuilding the adjacency matrices, the M_adj of
+    # the ith graph is rebuilt by get_M_adj(i).
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.AD_sum_mst = arrays["AD_sum_mst"]
+        self.CN_ms = arrays["CN_ms"]
+        self.num_star = arrays["num_star"]
+        self.offset = arrays["offset"]
+        self.M_adj_triu = arrays["M_adj_triu"]
+        self.k_vector_q_m = [
+            arrays["k_vector"],
+            float(arrays["q_m"][0]),
+            float(arrays["q_m"][1]),
+        ]
+
+    def __len__(self):
+        return len(self.AD_sum_mst)
+
+    # rebuild the adjacency matrix (float64) of the ith graph
+    def get_M_adj(self, i_graph):
+        num_star = int(self.num_star[i_graph])
+        i_start, i_end = self.offset[i_graph], self.offset[i_graph + 1]
+        M_adj = np.zeros((num_star, num_star))
+        M_adj[get_triu_indices(num_star)] = self.M_adj_triu[i_start:i_end]
+        return M_adj + M_adj.T
+
+
+# generate the columnar arrays of the graphs
+# input:
+# the graph list sorted by AD_sum_mst
+# the dtype of the adjacency values, float32 halves the size of the database
+# output:
+# the arrays of the graphs, see database_keys (without the k-vector)
+def gen_graph_arrays(graph_list, dtype=np.float64):
+    num_star = np.array([graph["M_adj"].shape[0] for graph in graph_list], dtype=int)
+    offset = np.zeros(len(graph_list) + 1, dtype=np.int64)
+    np.cumsum(num_star * (num_star - 1) // 2, out=offset[1:])
+    if len(graph_list) > 0:
+        M_adj_triu = np.concatenate(
+            [
+                graph["M_adj"][get_triu_indices(graph["M_adj"].shape[0])]
+                for graph in graph_list
+            ]
+        ).astype(dtype)
+    else:
+        M_adj_triu = np.zeros(0, dtype=dtype)
+    return {
+        "AD_sum_mst": np.array([graph["AD_sum_mst"] for graph in graph_list]),
+        "CN_ms": np.array([int(graph["CN_ms"]) for graph in graph_list], dtype=int),
+        "num_star": num_star,
+        "offset": offset,
+        "M_adj_triu": M_adj_triu,
+    }
+
+
+# generate the columnar arrays of the database
+# input:
+# the graph list sorted by AD_sum_mst, the k-vector & [q,m]
+# the dtype of the adjacency values
+# output:
+# the arrays, see database_keys
+def gen_database_arrays(graph_list, k_vector_q_m, dtype=np.float64):
+    k_vector, q, m = k_vector_q_m
+    arrays = gen_graph_arrays(graph_list, dtype)
+    arrays["k_vector"] = np.asarray(k_vector)
+    arrays["q_m"] = np.array([q, m])
+    return arrays
+
+
+# delete & insert some graphs of the database, the order of AD_sum_mst is kept
+# & the k-vector is rebuilt. Only the arrays are copied, no graph is rebuilt.
+# input:
+# the arrays of the database
+# the CNs of the main stars whose graphs are deleted
+# the graphs which are inserted
+# output:
+# the arrays of the updated database
+def update_database_arrays(arrays, CN_ms_delete, graph_list_insert, para):
+    arrays_insert = gen_graph_arrays(
+        sorted(graph_list_insert, key=lambda e: e["AD_sum_mst"]),
+        arrays["M_adj_triu"].dtype,
+    )
+    i_keep = np.flatnonzero(~np.isin(arrays["CN_ms"], CN_ms_delete))
+
+    # the kept graphs are followed by the inserted graphs, then sorted by
+    # AD_sum_mst, the ties are sorted by the txt file name (CN_ms.txt), which is
+    # the same as gen_database
+    AD_sum_mst = np.concatenate(
+        [arrays["AD_sum_mst"][i_keep], arrays_insert["AD_sum_mst"]]
+    )
+    CN_ms = np.concatenate([arrays["CN_ms"][i_keep], arrays_insert["CN_ms"]])
+    i_order = np.lexsort((CN_ms.astype(str), AD_sum_mst))
+    num_star = np.concatenate([arrays["num_star"][i_keep], arrays_insert["num_star"]])
+
+    # the adjacency values are gathered by the segments in the new order
+    M_adj_triu = np.concatenate([arrays["M_adj_triu"], arrays_insert["M_adj_triu"]])
+    i_start = np.concatenate(
+        [
+            arrays["offset"][i_keep],
+            arrays_insert["offset"][:-1] + len(arrays["M_adj_triu"]),
+        ]
+    )[i_order]
+    num_triu = (num_star * (num_star - 1) // 2)[i_order]
+    offset = np.zeros(len(i_order) + 1, dtype=np.int64)
+    np.cumsum(num_triu, out=offset[1:])
+    i_triu = np.repeat(i_start - offset[:-1], num_triu) + np.arange(offset[-1])
+
+    k_vector, q, m = gen_k_vector_AD_sum(AD_sum_mst[i_order], para)
+    return {
+        "AD_sum_mst": AD_sum_mst[i_order],
+        "CN_ms": CN_ms[i_order],
+        "num_star": num_star[i_order],
+        "offset": offset,
+        "M_adj_triu": M_adj_triu[i_triu],
+        "k_vector": k_vector,
+        "q_m": np.array([q, m]),
+    }
+
+
+# save the database
+# input:
+# the graph list sorted by AD_sum_mst, the k-vector & [q,m]
+# the directory of the database, the dtype of the adjacency values
+def save_database(graph_list, k_vector_q_m, database_dir, dtype=np.float64):
+    arrays = gen_database_arrays(graph_list, k_vector_q_m, dtype)
+    save_database_arrays(arrays, database_dir)
+
+
+# save the arrays of the database, see database_keys
+def save_database_arrays(arrays, database_dir):
+    os.makedirs(database_dir, exist_ok=True)
+    for key in database_keys:
+        np.save(os.path.join(database_dir, key + ".npy"), arrays[key])
+
+
+# load the database
+# input:
+# the directory of the database
+# mmap_mode: see np.load, None loads the database into the memory
+# output:
+# the GraphDatabase
+def load_database(database_dir, mmap_mode="r"):
+    arrays = dict()
+    for key in database_keys:
+        arrays[key] = np.load(os.path.join(database_dir, key + ".npy"), mmap_mode)
+    return GraphDatabase(arrays)
+
+
+# publish the database to the shared memory, multiprocessing.shared_memory needs
+# python >= 3.8.
+# input:
+# the GraphDatabase
+# output:
+# the shared memory blocks, which should be closed & unlinked by the publisher
+# after all the processes finish
+# the description of the blocks for attach_database
+def share_database(database):
+    from multiprocessing import shared_memory
+
+    shm_list = []
+    database_desc = dict()
+    for key in database_keys:
+        array = np.ascontiguousarray(database.arrays[key])
+        # the size of a shared memory block must be positive
+        shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, array.dtype, buffer=shm.buf)[...] = array
+        shm_list.append(shm)
+        database_desc[key] = (shm.name, array.shape, array.dtype.str)
+    return shm_list, database_desc
+
+
+# attach the database published by share_database, without copying
+# input:
+# the description of the shared memory blocks
+# output:
+# the GraphDatabase, whose arrays are read-only views of the shared memory
+def attach_database(database_desc):
+    arrays = dict()
+    shm_list = []
+    for key in database_keys:
+        name, shape, dtype = database_desc[key]
+        shm = attach_shared_memory(name)
+        arrays[key] = np.ndarray(shape, dtype, buffer=shm.buf)
+        arrays[key].flags.writeable = False
+        shm_list.append(shm)
+    database = GraphDatabase(arrays)
+    # the blocks must live as long as the arrays
+    database.shm_list = shm_list
+    return database
+
+
+# attach a shared memory block without tracking it
+# Note that the publisher unlinks the blocks, but SharedMemory registers every
+# attached block with the resource tracker, which would warn about the leak or
+# unlink the block again when the attaching process exits. The argument 'track'
+# is only available since python 3.13. Before, the block is registered, which is
+# harmless for the processes started by the publisher (e.g., the workers of a
+# multiprocessing.Pool): they share the resource tracker of the publisher, where
+# the block is already registered, & the publisher unregisters it by unlink.
+def attach_shared_memory(name):
+    from multiprocessing import shared_memory
+
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    return shared_memory.SharedMemory(name=name)
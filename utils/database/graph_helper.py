@@ -7,6 +7,9 @@ Each graph is a dictionary, which has the key-value: 'CN_ms':CN_ms,'M_adj':M_adj
 Note that the following graph match is based only on edges, so the diagonals of 
 adjacency matrix M_adj are 0.
 
+The graph is generated from the star frame of a star image (gen_graph), or directly
+from the catalog (gen_graph_catalog), both give the same graph.
+
 Written in 2020.01.26, revised in 2022.12.06
 by Zhiyuan You
 """
@@ -14,6 +17,8 @@ by Zhiyuan You
 import math
 import numpy as np
 
+from utils.simulator_helper import gen_inertial_vector, project_stars
+
 
 # CN: CatalogNumber
 # VM: VisualMagnitude
@@ -39,70 +44,73 @@ deg2rad = math.pi / 180
 rad2deg = 180 / math.pi
 
 
-def gen_graph(lines):
-    num_star = len(lines)
-
+# generate the graph of a star image
+# input:
+# the star frame of the stars whose AD(angular distance) is less than R_AD
+# output:
+# the graph of the input stars
+def gen_graph(frame):
+    # generate unit vector for calculating angular distance, shape: (num_star, 3)
+    v_inertial = gen_inertial_vector(frame["RA"], frame["Dec"])
+
+    # the main star is the first star
+    return gen_graph_vector(int(frame["CN"][0]), v_inertial)
+
+
+# generate the graph of the main star directly from the catalog, the same as
+# simulate_one_star + select_R_AD + gen_graph, but without the star frame
+# input:
+# the catalog dict (see load_catalog) & its SkyIndex, the index of the main star
+# output:
+# the graph of the main star, None if it is a double star
+def gen_graph_catalog(catalog, i_ms, para, sky_index):
+    v_ms = catalog["v_inertial"][i_ms]
+    AD_max = min(max(para.R_AD, para.AD_2s_thre), para.FOV_max)
+    i_ns_list = sky_index.query(v_ms, AD_max)
+    i_ns_list = i_ns_list[i_ns_list != i_ms]
+
+    # if there are some numerous errors, |cos| may slightly > 1
+    cos = np.matmul(catalog["v_inertial"][i_ns_list], v_ms)
+    AD_ms_ns = np.arccos(np.clip(cos, -1, 1)) * rad2deg
+    # the main star is dropped if there is a double star, see simulate_one_star
+    if np.any(AD_ms_ns <= para.AD_2s_thre):
+        return None
+
+    # the neighbor stars in R_AD, which are also in the FOV of the star image
+    i_ns_list = i_ns_list[(AD_ms_ns <= para.R_AD) & (AD_ms_ns < para.FOV_max)]
+    x_ns, y_ns = project_stars(
+        catalog["Dec"][i_ms],
+        catalog["RA"][i_ms],
+        catalog["v_inertial"][i_ns_list],
+        para.N_x,
+        para.N_y,
+        para.FOV_x,
+        para.FOV_y,
+    )
+    in_FOV = (np.abs(x_ns) <= para.N_x // 2) & (np.abs(y_ns) <= para.N_y // 2)
+
+    # the main star is the first star
+    i_s_list = np.concatenate([[i_ms], i_ns_list[in_FOV]])
+    return gen_graph_vector(int(catalog["CN"][i_ms]), catalog["v_inertial"][i_s_list])
+
+
+# generate the graph through the unit vectors of the stars
+# input:
+# the CN of the main star, the unit vectors of the stars, shape: (num_star, 3)
+# output:
+# the graph
+def gen_graph_vector(CN_ms, v_inertial):
     graph = dict()
 
-    # handle the main star
-    CN_ms = int(lines[0].strip().split()[0])
-
     # add 2 key-values to the graph dict
     graph["CN_ms"] = CN_ms
-    # CatalogNumber of the graph
-    CN_list = []
-    # X,Y in pixel space of the stars
-    XY_list = []
 
     # construct the adjacency matrix for the graph
-    M_adj = np.ones((num_star, num_star)) * float("inf")
-
-    for i_s1 in range(num_star):
-        data_s1 = lines[i_s1].strip().split()
-        assert len(data_s1) == 6
-
-        CN_s1, _, x_s1, y_s1, RA_s1, Dec_s1 = data_s1
-        CN_s1, x_s1, y_s1, RA_s1, Dec_s1 = (
-            int(CN_s1),
-            float(x_s1),
-            float(y_s1),
-            float(RA_s1),
-            float(Dec_s1),
-        )
-        CN_list.append(CN_s1)
-        XY_list.append((x_s1, y_s1))
-
-        # generate unit vector for calculating angular distance
-        vx_s1_inertial = np.cos(RA_s1) * np.cos(Dec_s1)
-        vy_s1_inertial = np.sin(RA_s1) * np.cos(Dec_s1)
-        vz_s1_inertial = np.sin(Dec_s1)
-
-        # the diagnal of the adjacency matrix
-        M_adj[i_s1][i_s1] = 0
-
-        for i_s2 in range(i_s1 + 1, num_star):
-            data_s2 = lines[i_s2].strip().split()
-            assert len(data_s2) == 6
-
-            CN_s2, _, _, _, RA_s2, Dec_s2 = data_s2
-            CN_s2, RA_s2, Dec_s2 = int(CN_s2), float(RA_s2), float(Dec_s2)
-
-            # generate unit vector for calculating angular distance
-            vx_s2_inertial = np.cos(RA_s2) * np.cos(Dec_s2)
-            vy_s2_inertial = np.sin(RA_s2) * np.cos(Dec_s2)
-            vz_s2_inertial = np.sin(Dec_s2)
-
-            # if there are some numerous errors, |cos_inertial| may slightly > 1
-            cos_inertial = (
-                vx_s1_inertial * vx_s2_inertial
-                + vy_s1_inertial * vy_s2_inertial
-                + vz_s1_inertial * vz_s2_inertial
-            )
-            AD_inertial = np.arccos(np.clip(cos_inertial, -1, 1)) * rad2deg
-
-            # assign the element of the adjacency matrix
-            M_adj[i_s1][i_s2] = AD_inertial
-            M_adj[i_s2][i_s1] = AD_inertial
+    # if there are some numerous errors, |cos_inertial| may slightly > 1
+    cos_inertial = np.matmul(v_inertial, v_inertial.T)
+    M_adj = np.arccos(np.clip(cos_inertial, -1, 1)) * rad2deg
+    # the diagnal of the adjacency matrix
+    np.fill_diagonal(M_adj, 0)
 
     graph["M_adj"] = M_adj
-    return graph, CN_list, XY_list
+    return graph
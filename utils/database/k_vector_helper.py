@@ -15,30 +15,40 @@ by Zhiyuan You
 """
 
 
+import numpy as np
+
+
+# generate the k-vector of the AD sum in mst
+# input:
+# the graph list sorted by the AD sum in mst
+# output:
+# the k-vector & the parameters [q,m] of the linear equation z = mx + q
 def gen_k_vertor(graph_list, para):
+    # the sorted AD sum in mst
+    AD_sum_mst = np.array([graph["AD_sum_mst"] for graph in graph_list])
+    return gen_k_vector_AD_sum(AD_sum_mst, para)
+
+
+# the same as gen_k_vertor, but the input is the sorted AD sum in mst
+def gen_k_vector_AD_sum(AD_sum_mst, para):
     # create the 2 points: (0,AD_mst_min-kexi),(star_num-1,AD_mst_max+kexi)
-    star_num = len(graph_list)
-    AD_mst_min = graph_list[0]["AD_sum_mst"]
-    AD_mst_max = graph_list[-1]["AD_sum_mst"]
+    star_num = len(AD_sum_mst)
+    AD_mst_min = AD_sum_mst[0]
+    AD_mst_max = AD_sum_mst[-1]
     # the uncertainty caused by the machine error.
     kexi_machine = para.epsilon_machine * max(abs(AD_mst_min), abs(AD_mst_max))
 
-    # Note that since python's index begin at 0, but the k-vector paper's index begin at 1, so there are some small differences.
-    # the linear equation: z = mx + q, 2 points: (0,AD_mst_min-kexi),(star_num-1,AD_mst_max+kexi).
+    # Note that since python's index begin at 0, but the k-vector paper's index
+    # begin at 1, so there are some small differences.
+    # the linear equation: z = mx + q, 2 points: (0,AD_mst_min-kexi),
+    # (star_num-1,AD_mst_max+kexi).
     m = (AD_mst_max - AD_mst_min + 2 * kexi_machine) / (star_num - 1)
     q = AD_mst_min - kexi_machine
 
     # generate the k-vector
-    k_vector = []
-    for i in range(star_num):
-        z = m * i + q
-        k_temp = 0
-        for graph in graph_list:
-            if graph["AD_sum_mst"] <= z:
-                k_temp += 1
-            else:
-                break
-        k_vector.append(k_temp)
+    # the ith element of k-vector is the number of AD sum that <= z_i = m * i + q
+    z = m * np.arange(star_num) + q
+    k_vector = np.searchsorted(AD_sum_mst, z, side="right")
     return k_vector, q, m
 
 
@@ -11,6 +11,8 @@ By Zhiyuan You
 import math
 import numpy as np
 
+from utils.simulator_helper import gen_inertial_vector
+
 
 # CN: CatalogNumber
 # VM: VisualMagnitude
@@ -28,32 +30,17 @@ deg2rad = math.pi / 180
 rad2deg = 180 / math.pi
 
 
-def select_R_AD(lines, para):
-    data_ms = lines[0].strip().split()
-    assert len(data_ms) == 6
-
+# select the stars arround the main star in R_AD
+# input:
+# the star frame of a star image, the main star is the 0th star
+# output:
+# the star frame of the stars whose angular distance is not larger than R_AD
+def select_R_AD(frame, para):
     # generate unit vector for calculating angular distance
-    CN_ms, _, _, _, RA_ms, Dec_ms = data_ms
-    CN_ms, RA_ms, Dec_ms = int(CN_ms), float(RA_ms), float(Dec_ms)
-    vz_ms = np.sin(Dec_ms)
-    vx_ms = np.cos(RA_ms) * np.cos(Dec_ms)
-    vy_ms = np.sin(RA_ms) * np.cos(Dec_ms)
-
-    for i_ns in range(len(lines) - 1, 0, -1):
-        data_ns = lines[i_ns].strip().split()
-        assert len(data_ns) == 6
-        CN_ns, _, _, _, RA_ns, Dec_ns = data_ns
-        CN_ns, RA_ns, Dec_ns = int(CN_ns), float(RA_ns), float(Dec_ns)
-
-        # generate unit vector for calculating angular distance
-        vz_ns = np.sin(Dec_ns)
-        vx_ns = np.cos(RA_ns) * np.cos(Dec_ns)
-        vy_ns = np.sin(RA_ns) * np.cos(Dec_ns)
-
-        # if there are some numerous errors, |cos| may slightly > 1
-        cos = vx_ns * vx_ms + vy_ns * vy_ms + vz_ns * vz_ms
-        AD_ms_ns = np.arccos(np.clip(cos, -1, 1)) * rad2deg
-        if AD_ms_ns > para.R_AD:
-            lines.pop(i_ns)
-
-    return lines
+    v_inertial = gen_inertial_vector(frame["RA"], frame["Dec"])
+
+    # if there are some numerous errors, |cos| may slightly > 1
+    cos = np.matmul(v_inertial, v_inertial[0])
+    AD_ms_ns = np.arccos(np.clip(cos, -1, 1)) * rad2deg
+    AD_ms_ns[0] = 0
+    return frame[AD_ms_ns <= para.R_AD]
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+This code is used to update the database incrementally, when some stars are
+deleted from or inserted into the catalog.
+
+A changed star only affects the main stars around it:
+    the star image of a main star contains the stars whose AD with the main
+    star is less than FOV_max, so these star images are simulated again.
+    the graph of a main star contains the stars whose AD with the main star is
+    not larger than R_AD, & a main star is dropped if there is a star whose AD
+    is not larger than AD_2s_thre (double star), so only the graphs of the main
+    stars in max(R_AD, AD_2s_thre) are generated again.
+The main stars are found through the SkyIndex, the other graphs are kept, so the
+cost is proportional to the number of the changed stars.
+
+Written in 2026.10.18
+"""
+
+
+import numpy as np
+
+from utils.common.mst_helper import gen_mst
+from utils.database.database_helper import update_database_arrays
+from utils.database.graph_helper import gen_graph_catalog
+from utils.simulator_helper import simulate_one_star
+
+
+# CN: CatalogNumber
+# AD: angular distance
+# FOV: field of view
+# R: Radius
+# _ms: main star
+# _2s: double star
+
+
+# delete some stars from & insert some stars into the catalog sorted by VM, the
+# order of VM is kept, the stars with the same VM keep the order of the catalog
+# & the inserted stars follow them
+# input:
+# the catalog sorted by VM, the CNs of the deleted stars, the inserted catalog
+# output:
+# the updated catalog sorted by VM
+def update_catalog(catalog, CN_delete_list, catalog_insert):
+    i_keep = np.flatnonzero(~np.isin(catalog["CN"], CN_delete_list))
+    VM = np.concatenate([catalog["VM"][i_keep], catalog_insert["VM"]])
+    i_sort = np.argsort(VM, kind="stable")
+    return {
+        key: np.concatenate([catalog[key][i_keep], catalog_insert[key]])[i_sort]
+        for key in catalog
+    }
+
+
+# find the main stars whose AD with any of the changed stars is not larger than R_AD
+# input:
+# the SkyIndex of the catalog, the unit vectors of the changed stars
+# output:
+# the indexes of the main stars in the catalog
+def find_affected_stars(sky_index, v_change, R_AD):
+    i_ms_list = [sky_index.query(v, R_AD) for v in v_change]
+    return np.unique(np.concatenate([np.zeros(0, dtype=int)] + i_ms_list))
+
+
+# update the database after deleting & inserting some stars
+# input:
+# the arrays of the database (see database_helper), loaded into the memory
+# the old catalog, the new catalog & its SkyIndex
+# the CNs of the deleted stars (in the old catalog) & the inserted stars (in
+# the new catalog)
+# output:
+# the arrays of the updated database
+# the star images simulated again, {CN_ms: frame}, the star frame is None if the
+# main star is deleted or becomes a double star
+def update_database(
+    arrays,
+    catalog_old,
+    catalog_new,
+    sky_index_new,
+    CN_delete_list,
+    CN_insert_list,
+    para,
+):
+    # the unit vectors of the changed stars
+    i_delete = np.flatnonzero(np.isin(catalog_old["CN"], CN_delete_list))
+    i_insert = np.flatnonzero(np.isin(catalog_new["CN"], CN_insert_list))
+    v_change = np.concatenate(
+        [catalog_old["v_inertial"][i_delete], catalog_new["v_inertial"][i_insert]]
+    )
+
+    # simulate the star images which contain the changed stars
+    frame_dict = {int(CN_ms): None for CN_ms in CN_delete_list}
+    i_ms_simu = find_affected_stars(sky_index_new, v_change, para.FOV_max)
+    for i_ms in i_ms_simu:
+        CN_ms = int(catalog_new["CN"][i_ms])
+        frame_dict[CN_ms] = simulate_one_star(catalog_new, i_ms, para, sky_index_new)
+
+    # generate the graphs of the main stars around the changed stars
+    i_ms_graph = find_affected_stars(
+        sky_index_new, v_change, max(para.R_AD, para.AD_2s_thre)
+    )
+    CN_ms_graph = [int(CN_ms) for CN_ms in catalog_new["CN"][i_ms_graph]]
+    graph_list = []
+    for i_ms in i_ms_graph:
+        graph = gen_graph_catalog(catalog_new, i_ms, para, sky_index_new)
+        if graph is None:
+            continue
+        graph, _ = gen_mst(graph)
+        graph_list.append(graph)
+
+    # the old graphs of the deleted stars & the main stars above are replaced
+    CN_ms_delete = [int(CN_ms) for CN_ms in CN_delete_list] + CN_ms_graph
+    arrays = update_database_arrays(arrays, CN_ms_delete, graph_list, para)
+    return arrays, frame_dict
@@ -1,16 +1,21 @@
 # -*- coding: utf-8 -*-
 """
-This code is used to generate the simulation star image in the noise of pixel. 
-The pixel of the pixel noise satisfies guassian distribution, with the 
+This code is used to generate the simulation star image in the noise of pixel.
+The pixel of the pixel noise satisfies guassian distribution, with the
 average 0 & the standard deviation sigma_pn, which is a hyper parameter.
 
-This code is used to generate the simulation star image in the noise of lost 
-star. Each star has the possibility to be lost except the main star. In practice, 
-if the main star is lost, there is a large possibility of failure. 
+This code is used to generate the simulation star image in the noise of lost
+star. Each star has the possibility to be lost except the main star. In practice,
+if the main star is lost, there is a large possibility of failure.
 
-This code is used to generate the simulation star image in the noise of spike. 
-A spike is the noise that looks the same with the star. The noise is randomly 
-added into the image according to randoly generated pixel coordinates. 
+This code is used to generate the simulation star image in the noise of spike.
+A spike is the noise that looks the same with the star. The noise is randomly
+added into the image according to randoly generated pixel coordinates.
+
+The noises are added to a copy of the star frame (see star_frame_helper), the
+unknown fields of the stars with noise are nan. All the random numbers are drawn
+from the np.random.Generator of the trial, so a trial is reproduced by its seed,
+no matter which process runs it, see gen_trial_rng.
 
 Written in 2020.01.26, revised in 2022.12.06
 By Zhiyuan You
@@ -18,7 +23,8 @@ By Zhiyuan You
 
 
 import numpy as np
-import random
+
+from utils.common.star_frame_helper import gen_star_frame
 
 
 # CN: CatalogNumber
@@ -35,53 +41,58 @@ import random
 # _pn: pixel noise
 
 
-def add_noise(lines, args, para):
+# the random number generator of a trial, e.g., the ith star image of a search
+# input:
+# the seed of the run, the index of the trial
+# output:
+# the np.random.Generator, whose stream only depends on (seed, i_trial)
+def gen_trial_rng(seed, i_trial):
+    return np.random.default_rng([seed, i_trial])
+
+
+# add the noises to the star frame
+# input:
+# the star frame, which is not changed
+# the np.random.Generator of the trial
+# output:
+# the star frame with the noises
+def add_noise(frame, args, para, rng):
     if args.std_position:
-        add_position_noise(lines, args.std_position)
+        frame = add_position_noise(frame, args.std_position, rng)
     if args.num_lost:
-        add_lost_noise(lines, args.num_lost)
+        frame = add_lost_noise(frame, args.num_lost, rng)
     if args.num_false:
-        add_false_noise(lines, args.num_false, para)
-    return lines
+        frame = add_false_noise(frame, args.num_false, para, rng)
+    return frame
 
 
 # assume pn(pixel noise)'s distributes according to gaussian nosie. The average
 # of the pn is 0, the std(standard deviation) is sigma_pn.
-def add_position_noise(lines, sigma_pn):
-    lines_pn = []
-    for i_ns in range(len(lines)):
-        data_ns = lines[i_ns].strip().split()
-        assert len(data_ns) == 6
-        CN_ns, _, x_ns, y_ns, _, _ = data_ns
-        CN_ns, x_ns, y_ns = int(CN_ns), float(x_ns), float(y_ns)
-
-        # add pixel noise to neighbor star
-        x_pn = np.clip(sigma_pn * np.random.randn(1)[0], -3 * sigma_pn, 3 * sigma_pn)
-        y_pn = np.clip(sigma_pn * np.random.randn(1)[0], -3 * sigma_pn, 3 * sigma_pn)
-        x_ns_pn = x_ns + x_pn
-        y_ns_pn = y_ns + y_pn
-
-        line_ns = f"{CN_ns} {None} {x_ns_pn} {y_ns_pn} {None} {None}"
-        lines_pn.append(line_ns)
+def add_position_noise(frame, sigma_pn, rng):
+    # the pixel noise of every star, clipped in 3 sigma_pn
+    XY_pn = np.clip(
+        rng.normal(0, sigma_pn, (len(frame), 2)), -3 * sigma_pn, 3 * sigma_pn
+    )
 
-    return lines_pn
+    # VM, RA & Dec are unknown after adding the pixel noise
+    frame_pn = gen_star_frame(len(frame))
+    frame_pn["CN"] = frame["CN"]
+    frame_pn["x"] = frame["x"] + XY_pn[:, 0]
+    frame_pn["y"] = frame["y"] + XY_pn[:, 1]
+    return frame_pn
 
 
-def add_lost_noise(lines, num_lost):
+def add_lost_noise(frame, num_lost, rng):
     # randomly choose num_lost neighbor stars to be lost
-    i_lost = random.sample(list(range(1, len(lines))), num_lost)
-    i_lost = sorted(i_lost, reverse=True)
-    for i in i_lost:
-        lines.pop(i)
-    return lines
+    i_lost = rng.choice(np.arange(1, len(frame)), num_lost, replace=False)
+    return np.delete(frame, i_lost)
 
 
-def add_false_noise(lines, num_false, para):
+def add_false_noise(frame, num_false, para, rng):
     # randomly add num_false neighbor stars
-    # CN: 0, VM: None, RA: None, Dec: None, they are all impossible to occur.
-    for _ in range(num_false):
-        x_sn = (-1 + 2 * random.random()) * para.N_x // 2
-        y_sn = (-1 + 2 * random.random()) * para.N_y // 2
-        line_false = f"0 {None} {x_sn} {y_sn} {None} {None}"
-        lines.append(line_false)
-    return lines
+    # CN: 0, VM: nan, RA: nan, Dec: nan, they are all impossible to occur.
+    frame_false = gen_star_frame(num_false)
+    XY_false = rng.uniform(-1, 1, (num_false, 2))
+    frame_false["x"] = XY_false[:, 0] * para.N_x // 2
+    frame_false["y"] = XY_false[:, 1] * para.N_y // 2
+    return np.concatenate([frame, frame_false])
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+This code is used to read the SAO star catalog.
+
+Every record of the file 'sao' has 205 bytes (including the '\\n'), the fields
+are at fixed columns, so the whole file is read as a bytes buffer & viewed
+through a structured dtype, without parsing the lines one by one.
+
+The stars are sorted by VM (Visual Magnitude) & saved once, so the stars whose
+VM is less than any VM_thre are a prefix of the catalog, see select_VM.
+
+Written in 2026.10.18
+"""
+
+
+import numpy as np
+
+from utils.simulator_helper import gen_inertial_vector
+
+
+# CN: CatalogNumber
+# VM: VisualMagnitude
+# RA: RightAscension
+# Dec:  Declination
+
+
+# CN: line[0:6], VM: line[80:84], RA: line[183:193], Dec: line[193:204]
+SAO_dtype = np.dtype(
+    {
+        "names": ["CN", "VM", "RA", "Dec"],
+        "formats": ["S6", "S4", "S10", "S11"],
+        "offsets": [0, 80, 183, 193],
+        "itemsize": 205,
+    }
+)
+
+
+# read the SAO file
+# input:
+# the SAO file
+# output:
+# the records with the bytes fields 'CN', 'VM', 'RA', 'Dec'
+def read_SAO(f_read_name):
+    with open(f_read_name, "rb") as fr:
+        buf = fr.read()
+    # the last record may have no '\n'
+    if len(buf) % SAO_dtype.itemsize == SAO_dtype.itemsize - 1:
+        buf += b"\n"
+    assert len(buf) % SAO_dtype.itemsize == 0
+    return np.frombuffer(buf, dtype=SAO_dtype)
+
+
+# generate the catalog sorted by VM, the stars with the same VM keep the order
+# in the SAO file
+# input:
+# the records of the SAO file
+# output:
+# the catalog dict, see load_catalog
+def gen_VM_sorted_catalog(records):
+    VM = records["VM"].astype(float)
+    i_sort = np.argsort(VM, kind="stable")
+    records = records[i_sort]
+    RA = records["RA"].astype(float)
+    Dec = records["Dec"].astype(float)
+    return {
+        "CN": records["CN"].astype(int),
+        "VM": VM[i_sort],
+        "RA": RA,
+        "Dec": Dec,
+        "v_inertial": gen_inertial_vector(RA, Dec),
+    }
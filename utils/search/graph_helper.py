@@ -1,16 +1,17 @@
 # -*- coding: utf-8 -*-
 """
-This code is used to generate graph of every main star. 
+This code is used to generate graph of every main star.
 
-Each graph is a dictionary, which has the key-value: 'CN_ms':CN_ms,'M_adj':M_adj. 
+Each graph is a dictionary, which has the key-value: 'CN_ms':CN_ms,'M_adj':M_adj.
 
-Note that the following graph match is based only on edges, so the diagonals of 
+Note that the following graph match is based only on edges, so the diagonals of
 adjacency matrix M_adj are 0.
 
 Written in 2020.01.26, revised in 2022.12.06
 by Zhiyuan You
 """
 
+import functools
 import math
 import numpy as np
 
@@ -39,70 +40,54 @@ deg2rad = math.pi / 180
 rad2deg = 180 / math.pi
 
 
+# the tangent of the half FOV, cached for every camera
+@functools.lru_cache(maxsize=None)
+def get_tan_half_FOV(FOV_x, FOV_y):
+    return np.tan(FOV_x / 2 * deg2rad), np.tan(FOV_y / 2 * deg2rad)
+
+
+# convert the pixel coordinates to the unit vectors in the body frame
+# input:
+# the arrays of the pixel coordinates x, y
+# output:
+# the unit vectors, shape: (num_star, 3)
+def gen_body_vector(x_s, y_s, para):
+    tan_x, tan_y = get_tan_half_FOV(para.FOV_x, para.FOV_y)
+    vx_s_body = -x_s / para.N_x * 2 * tan_x
+    vy_s_body = -y_s / para.N_y * 2 * tan_y
+    vz_s_body = np.ones_like(vx_s_body)
+    v_body = np.stack([vx_s_body, vy_s_body, vz_s_body], axis=1)
+    temp_length = np.sqrt(vx_s_body**2 + vy_s_body**2 + vz_s_body**2)
+    return v_body / temp_length[:, None]
+
+
 # generate the graph of a star image
 # input:
-# lines contain information of stars whose AD(angular distance) is less than R_AD
+# the star frame of the stars whose AD(angular distance) is less than R_AD
 # output:
 # the graph of the input stars
-def gen_graph(lines, para):
+def gen_graph(frame, para):
     graph = dict()
 
+    # only the data 'CN, x, y' are used.
+    x_s = frame["x"]
+    y_s = frame["y"]
+
     # handle the main star
-    CN_ms = int(lines[0].strip().split()[0])
+    CN_ms = int(frame["CN"][0])
 
     # add 2 key-values to the graph dict
     graph["CN_ms"] = CN_ms
 
+    # generate unit vector for calculating angular distance
+    v_body = gen_body_vector(x_s, y_s, para)
+
     # create the adjacency matrix for the graph
-    M_adj = np.ones((len(lines), len(lines))) * float("inf")
-
-    for i_s1 in range(len(lines)):
-        data_s1 = lines[i_s1].strip().split()
-        assert len(data_s1) == 6
-
-        CN_s1, _, x_s1, y_s1, _, _ = data_s1
-        CN_s1, x_s1, y_s1 = int(CN_s1), float(x_s1), float(y_s1)
-
-        # generate unit vector for calculating angular distance
-        vx_s1_body = -x_s1 / para.N_x * 2 * np.tan(para.FOV_x / 2 * deg2rad)
-        vy_s1_body = -y_s1 / para.N_y * 2 * np.tan(para.FOV_y / 2 * deg2rad)
-        vz_s1_body = 1
-        temp_length = np.sqrt(vx_s1_body**2 + vy_s1_body**2 + vz_s1_body**2)
-        vx_s1_body = vx_s1_body / temp_length
-        vy_s1_body = vy_s1_body / temp_length
-        vz_s1_body = vz_s1_body / temp_length
-
-        # the diagnal of the adjacency matrix
-        M_adj[i_s1][i_s1] = 0
-
-        for i_s2 in range(i_s1 + 1, len(lines)):
-            data_s2 = lines[i_s2].strip().split()
-            assert len(data_s2) == 6
-
-            CN_s2, _, x_s2, y_s2, _, _ = data_s2
-            CN_s2, x_s2, y_s2 = int(CN_s2), float(x_s2), float(y_s2)
-
-            # generate unit vector for calculating angular distance
-            vx_s2_body = -x_s2 / para.N_x * 2 * np.tan(para.FOV_x / 2 * deg2rad)
-            vy_s2_body = -y_s2 / para.N_y * 2 * np.tan(para.FOV_y / 2 * deg2rad)
-            vz_s2_body = 1
-            temp_length = np.sqrt(vx_s2_body**2 + vy_s2_body**2 + vz_s2_body**2)
-            vx_s2_body = vx_s2_body / temp_length
-            vy_s2_body = vy_s2_body / temp_length
-            vz_s2_body = vz_s2_body / temp_length
-
-            # if there are some numerous errors, |cos| may slightly > 1
-            cos_body = (
-                vx_s1_body * vx_s2_body
-                + vy_s1_body * vy_s2_body
-                + vz_s1_body * vz_s2_body
-            )
-            AD_body = np.arccos(np.clip(cos_body, -1, 1)) * rad2deg
-
-            # haldle the edge of graph
-            # assign the element of the adjacency matrix
-            M_adj[i_s1][i_s2] = AD_body
-            M_adj[i_s2][i_s1] = AD_body
+    # if there are some numerous errors, |cos| may slightly > 1
+    cos_body = np.matmul(v_body, v_body.T)
+    M_adj = np.arccos(np.clip(cos_body, -1, 1)) * rad2deg
+    # the diagnal of the adjacency matrix
+    np.fill_diagonal(M_adj, 0)
 
     # add M_adj to the graph dict
     graph["M_adj"] = M_adj
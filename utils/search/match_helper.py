@@ -1,9 +1,9 @@
 # -*- coding: utf-8 -*-
 """
-This code is used to search the best match between the test graph & the databse 
-graph. The graph match algorithm is relatively slow so far. However, it is very 
-important that it is not a single star match or a pattern match, when the graph 
-match is done, every star in the graph is matched with the database. 
+This code is used to search the best match between the test graph & the databse
+graph. The graph match algorithm is relatively slow so far. However, it is very
+important that it is not a single star match or a pattern match, when the graph
+match is done, every star in the graph is matched with the database.
 
 Written in 2020.01.26, revised in 2022.12.06
 by Zhiyuan You
@@ -12,106 +12,440 @@ by Zhiyuan You
 
 import copy
 import numpy as np
+import warnings
 
 
-# match 2 graphs & calculate the error after match
+# construct the affinity matrix of 2 graphs
 # input:
 # 2 adjacency matrix of 2 graphs for match
 # output:
-# the match error of 2 graphs
-def match_graph(M_adj_g1, M_adj_g2, para):
-    # the number of vertex in 2 graph
+# the affinity matrix, whose row/column index i corresponds to the vertex pair
+# (i // num_g2, i % num_g2), i.e. the vertex i // num_g2 in g1 & the vertex
+# i % num_g2 in g2.
+def gen_affinity_matrix(M_adj_g1, M_adj_g2, para):
     num_g1, _ = M_adj_g1.shape
     num_g2, _ = M_adj_g2.shape
 
-    # construct all possible vertex pairs for match.
-    # In the affinity matrix, the vertex pairs are in the diagnal, this is where
-    # the variable name 'i_diag' comes from.
-    i_diag = []
-    for i_g1 in range(num_g1):
-        for i_g2 in range(num_g2):
-            i_diag.append((i_g1, i_g2))
-
-    # construct the affinity matrix
-    M_affi = np.zeros((num_g1 * num_g2, num_g1 * num_g2))
-    for i in range(num_g1 * num_g2):
-        for j in range(i, num_g1 * num_g2):
+    # the element of pair (i_g1_s1, i_g2_s1) & pair (i_g1_s2, i_g2_s2) compares
+    # the edge (i_g1_s1, i_g1_s2) in g1 with the edge (i_g2_s1, i_g2_s2) in g2.
+    # axes: i_g1_s1, i_g2_s1, i_g1_s2, i_g2_s2
+    # the operations are done in place, so only 1 array of the size is kept.
+    M_affi = np.subtract(M_adj_g1[:, None, :, None], M_adj_g2[None, :, None, :])
+    np.abs(M_affi, out=M_affi)
+    M_affi *= para.times_sub_AD
+    np.exp(M_affi, out=M_affi)
+    np.reciprocal(M_affi, out=M_affi)
+
+    # if there is a vertex, the element of the M_affi should be 0.
+    same_g1 = np.eye(num_g1, dtype=bool)[:, None, :, None]
+    same_g2 = np.eye(num_g2, dtype=bool)[None, :, None, :]
+    M_affi[same_g1 | same_g2] = 0
+    return M_affi.reshape(num_g1 * num_g2, num_g1 * num_g2)
+
+
+# construct the affinity operator of 2 graphs, which multiplies the affinity
+# matrix with a vector without materializing the affinity matrix
+# input:
+# 2 adjacency matrix of 2 graphs for match
+# output:
+# the function that returns M_affi.dot(vector)
+# Note that the elements of M_affi are generated block by block, one vertex of
+# g1 a time, so only a (num_g2, num_g1, num_g2) block is kept in memory instead of
+# the (num_g1 * num_g2, num_g1 * num_g2) matrix.
+def gen_affinity_operator(M_adj_g1, M_adj_g2, para):
+    num_g1, _ = M_adj_g1.shape
+    num_g2, _ = M_adj_g2.shape
+    i_g2 = np.arange(num_g2)
+
+    def dot_affi(vector):
+        M_vector = vector.reshape(num_g1, num_g2)
+        M_out = np.empty((num_g1, num_g2))
+        for i_g1_s1 in range(num_g1):
+            # axes: i_g2_s1, i_g1_s2, i_g2_s2
+            sub_AD = np.abs(M_adj_g1[i_g1_s1][None, :, None] - M_adj_g2[:, None, :])
+            block = 1 / np.exp(para.times_sub_AD * sub_AD)
             # if there is a vertex, the element of the M_affi should be 0.
-            if i_diag[i][0] == i_diag[j][0] or i_diag[i][1] == i_diag[j][1]:
-                pass
-            # if there are 2 edges, the none-diagnal of M_affi should be calculated.
-            else:
-                i_g1_s1 = i_diag[i][0]
-                i_g1_s2 = i_diag[j][0]
-                i_g2_s1 = i_diag[i][1]
-                i_g2_s2 = i_diag[j][1]
-                edge_g1 = M_adj_g1[i_g1_s1][i_g1_s2]
-                edge_g2 = M_adj_g2[i_g2_s1][i_g2_s2]
-                affi_value = 1 / np.exp(para.times_sub_AD * abs(edge_g1 - edge_g2))
-                M_affi[i][j] = affi_value
-                M_affi[j][i] = affi_value
-
-    # find the eigenvalue & eigenvector
-    eigenvalue, eigenvector = np.linalg.eig(M_affi)
-    # find the maximum eigenvalue
-    max_eigenvalue = np.max(eigenvalue)
-    i_max_eigenvalue = np.argmax(eigenvalue)
-    # find the principal eigenvector
-    prin_eigenvector = copy.deepcopy(eigenvector[:, i_max_eigenvalue])
+            block[:, i_g1_s1, :] = 0
+            block[i_g2, :, i_g2] = 0
+            M_out[i_g1_s1] = np.einsum("bcd,cd->b", block, M_vector)
+        return M_out.reshape(-1)
+
+    return dot_affi
+
+
+# find the principal eigenvector of the affinity matrix
+# input:
+# the affinity matrix
+# the eig_mode, None: para.eig_mode, see select_eig_mode
+# output:
+# the principal eigenvector, all the elements of which are positive
+# para.eig_mode:
+# 'eig': the full eigen-decomposition, kept as the reference for accuracy
+# 'eigh': the full eigen-decomposition of the symmetric M_affi, real-valued
+# 'power': power iteration, only the leading eigenpair is computed. If it does
+# not converge (e.g., it oscillates), the eigenvector of 'eigh' is used.
+def find_prin_eigenvector(M_affi, para, eig_mode=None):
+    num_pair = M_affi.shape[0]
+    if eig_mode is None:
+        eig_mode = para.get("eig_mode", "eig")
+
+    if eig_mode == "eig":
+        # find the eigenvalue & eigenvector
+        eigenvalue, eigenvector = np.linalg.eig(M_affi)
+        # find the maximum eigenvalue
+        i_max_eigenvalue = np.argmax(eigenvalue)
+        # find the principal eigenvector
+        prin_eigenvector = copy.deepcopy(eigenvector[:, i_max_eigenvalue])
+    elif eig_mode == "eigh":
+        prin_eigenvector = find_prin_eigenvector_eigh(M_affi)
+    elif eig_mode == "power":
+        prin_eigenvector, converged = power_iteration(M_affi.dot, num_pair, para)
+        if not converged:
+            prin_eigenvector = find_prin_eigenvector_eigh(M_affi)
+    else:
+        raise ValueError(f"Unknown eig_mode: {eig_mode}")
+
     # make sure all the elements of the prin_eigenvector have the same plus-minus
     assert (
-        sum(prin_eigenvector >= 0) == num_g1 * num_g2
-        or sum(prin_eigenvector <= 0) == num_g1 * num_g2
+        sum(prin_eigenvector >= 0) == num_pair or sum(prin_eigenvector <= 0) == num_pair
     )
     # make sure all the elements of the prin_eigenvector are positive
-    if sum(prin_eigenvector <= 0) == num_g1 * num_g2:
+    if sum(prin_eigenvector <= 0) == num_pair:
         prin_eigenvector = -prin_eigenvector
+    return prin_eigenvector
 
-    # construct the 0-1 vector which indicates the match result
-    vector_judge = np.array([None] * (num_g1 * num_g2))
-    sum_1_0 = sum(vector_judge == 0) + sum(vector_judge == 1)
-    # only if all values in vector_judge are 0 or 1, terminate.
-    while not sum_1_0 == num_g1 * num_g2:
-        max_elem = np.max(prin_eigenvector)
-        i_max_elem = np.argmax(prin_eigenvector)
-        vector_judge[i_max_elem] = 1
-        prin_eigenvector[i_max_elem] = -float("inf")
-        i_g1_max = i_diag[i_max_elem][0]
-        i_g2_max = i_diag[i_max_elem][1]
-        for i in range(num_g1 * num_g2):
-            i_g1, i_g2 = i_diag[i]
-            if not (i_g1 == i_g1_max and i_g2 == i_g2_max):
-                if i_g1 == i_g1_max or i_g2 == i_g2_max:
-                    vector_judge[i] = 0
-                    prin_eigenvector[i] = -float("inf")
-        sum_1_0 = sum(vector_judge == 0) + sum(vector_judge == 1)
 
-    # construct 2 vertex list represent the match result
-    i_g1_list = []
-    i_g2_list = []
-    for i in range(num_g1 * num_g2):
-        if vector_judge[i] == 1:
-            i_g1 = i_diag[i][0]
-            i_g2 = i_diag[i][1]
+def find_prin_eigenvector_eigh(M_affi):
+    # the eigenvalues of eigh are in ascending order
+    _, eigenvector = np.linalg.eigh(M_affi)
+    return eigenvector[..., -1].copy()
+
+
+# find the principal eigenvector through power iteration
+# input:
+# the function that multiplies the affinity matrix with a vector
+# the length of the vector, i.e. num_pair
+# output:
+# the normalized principal eigenvector
+# whether the iteration converges in para.eig_max_iter iterations
+# Note that all the elements of M_affi are non-negative, so the iteration from the
+# positive start vector converges to the Perron vector at the rate of
+# max(|lambda_min|, lambda_2) / lambda_max. However, M_affi has a negative
+# eigenvalue close to -lambda_max when a graph has few vertexes: for random 3x3 to
+# 5x5 matches the ratio reaches 0.9999, & the iteration oscillates instead of
+# converging in 1000 iterations. From 6x6 on, the ratio is below 0.83.
+def power_iteration(dot_affi, num_pair, para):
+    eig_tol = para.get("eig_tol", 1e-10)
+    eig_max_iter = para.get("eig_max_iter", 1000)
+
+    vector = np.ones(num_pair) / np.sqrt(num_pair)
+    for _ in range(eig_max_iter):
+        vector_next = dot_affi(vector)
+        norm = np.linalg.norm(vector_next)
+        # if the affinity matrix is all zero, every vertex pair is equal.
+        if norm == 0:
+            return vector, True
+        vector_next = vector_next / norm
+        diff = np.max(np.abs(vector_next - vector))
+        vector = vector_next
+        if diff < eig_tol:
+            return vector, True
+    return vector, False
+
+
+# find the principal eigenvectors of a stack of affinity matrixes through power
+# iteration, see power_iteration
+# input:
+# the affinity matrixes, (num_batch, num_pair, num_pair)
+# output:
+# the normalized principal eigenvectors, (num_batch, num_pair)
+# whether the iteration of each affinity matrix converges
+# Note that a converged eigenvector is not iterated any more, so a slow candidate
+# only keeps itself iterating.
+def power_iteration_batch(M_affi, para):
+    eig_tol = para.get("eig_tol", 1e-10)
+    eig_max_iter = para.get("eig_max_iter", 1000)
+    num_batch, num_pair, _ = M_affi.shape
+
+    vector = np.ones((num_batch, num_pair)) / np.sqrt(num_pair)
+    converged = np.zeros(num_batch, dtype=bool)
+    i_active = np.arange(num_batch)
+    M_affi_active = M_affi
+    for _ in range(eig_max_iter):
+        vector_active = vector[i_active]
+        vector_next = np.matmul(M_affi_active, vector_active[:, :, None])[:, :, 0]
+        norm = np.linalg.norm(vector_next, axis=1, keepdims=True)
+        # if the affinity matrix is all zero, every vertex pair is equal.
+        norm_n0 = norm > 0
+        vector_next = np.where(
+            norm_n0, vector_next / np.where(norm_n0, norm, 1), vector_active
+        )
+        diff = np.max(np.abs(vector_next - vector_active), axis=1)
+        vector[i_active] = vector_next
+        converged[i_active] = diff < eig_tol
+        # the affinity matrixes are copied only when a candidate converges
+        if converged[i_active].any():
+            M_affi_active = M_affi_active[~converged[i_active]]
+            i_active = i_active[~converged[i_active]]
+        if len(i_active) == 0:
+            break
+    return vector, converged
+
+
+# discretize the principal eigenvector into a one-to-one match of vertexes
+# input:
+# the principal eigenvector, reshaped to (num_g1, num_g2)
+# output:
+# 2 vertex list represent the match result, in the ascending order of g1
+# para.discrete_mode:
+# 'greedy': the largest element is matched first, then the vertex pairs sharing
+# a vertex with it are removed, until every vertex of the smaller graph is matched.
+# 'hungarian': the match maximizing the sum of the elements, which needs scipy.
+def discretize(M_prin_eigenvector, para):
+    num_g1, num_g2 = M_prin_eigenvector.shape
+    num_match = min(num_g1, num_g2)
+    discrete_mode = para.get("discrete_mode", "greedy")
+
+    if discrete_mode == "greedy":
+        # visit the vertex pairs from the largest element, the sort is stable so
+        # that equal elements are visited in the same order as np.argmax.
+        i_sort = np.argsort(-M_prin_eigenvector, axis=None, kind="stable")
+        used_g1 = np.zeros(num_g1, dtype=bool)
+        used_g2 = np.zeros(num_g2, dtype=bool)
+        i_g1_list = []
+        i_g2_list = []
+        for i_g1, i_g2 in zip(*np.divmod(i_sort, num_g2)):
+            if used_g1[i_g1] or used_g2[i_g2]:
+                continue
+            used_g1[i_g1] = True
+            used_g2[i_g2] = True
             i_g1_list.append(i_g1)
             i_g2_list.append(i_g2)
+            if len(i_g1_list) == num_match:
+                break
+        i_g1_list = np.array(i_g1_list)
+        i_g2_list = np.array(i_g2_list)
+        i_g1_sort = np.argsort(i_g1_list)
+        return i_g1_list[i_g1_sort], i_g2_list[i_g1_sort]
+    elif discrete_mode == "hungarian":
+        from scipy.optimize import linear_sum_assignment
+
+        return linear_sum_assignment(M_prin_eigenvector, maximize=True)
+    else:
+        raise ValueError(f"Unknown discrete_mode: {discrete_mode}")
+
+
+# select the affinity mode of a match
+# input:
+# the number of vertex in 2 graph
+# output:
+# para.affi_mode:
+# 'dense': construct the affinity matrix
+# 'implicit': never materialize the affinity matrix, which costs
+# (num_g1 * num_g2)^2 * 8 bytes, the power iteration is used. It is several times
+# slower, every product recomputes all the elements of the affinity matrix.
+# 'auto': 'implicit' only if the affinity matrix costs more than
+# para.affi_max_bytes & both graphs have more than 5 vertexes, see
+# power_iteration.
+def select_affi_mode(num_g1, num_g2, para):
+    affi_mode = para.get("affi_mode", "dense")
+    if affi_mode == "auto":
+        affi_bytes = 8 * (num_g1 * num_g2) ** 2
+        if affi_bytes > para.affi_max_bytes and min(num_g1, num_g2) > 5:
+            affi_mode = "implicit"
+        else:
+            affi_mode = "dense"
+    return affi_mode
+
+
+# select the eig_mode of a dense match
+# input:
+# the number of vertex in 2 graph
+# output:
+# para.eig_mode, but 'eigh' instead of 'power' if a graph has 5 vertexes or
+# less, where the power iteration oscillates until para.eig_max_iter & falls
+# back to 'eigh' anyway, see power_iteration.
+def select_eig_mode(num_g1, num_g2, para):
+    eig_mode = para.get("eig_mode", "eig")
+    if eig_mode == "power" and min(num_g1, num_g2) <= 5:
+        eig_mode = "eigh"
+    return eig_mode
+
+
+# match 2 graphs & calculate the error after match
+# input:
+# 2 adjacency matrix of 2 graphs for match
+# output:
+# the match error of 2 graphs
+def match_graph(M_adj_g1, M_adj_g2, para):
+    # the number of vertex in 2 graph
+    num_g1, _ = M_adj_g1.shape
+    num_g2, _ = M_adj_g2.shape
+
+    # see select_affi_mode
+    affi_mode = select_affi_mode(num_g1, num_g2, para)
+    if affi_mode == "dense":
+        # construct the affinity matrix
+        M_affi = gen_affinity_matrix(M_adj_g1, M_adj_g2, para)
+        # find the principal eigenvector, see select_eig_mode
+        eig_mode = select_eig_mode(num_g1, num_g2, para)
+        prin_eigenvector = find_prin_eigenvector(M_affi, para, eig_mode)
+    elif affi_mode == "implicit":
+        # the start vector & M_affi are non-negative, so is the eigenvector.
+        dot_affi = gen_affinity_operator(M_adj_g1, M_adj_g2, para)
+        prin_eigenvector, converged = power_iteration(dot_affi, num_g1 * num_g2, para)
+        # there is no M_affi for eigh, so the last iterate is used
+        if not converged:
+            warnings.warn(
+                f"The power iteration of a {num_g1}x{num_g2} match does not "
+                f"converge in {para.get('eig_max_iter', 1000)} iterations"
+            )
+    else:
+        raise ValueError(f"Unknown affi_mode: {affi_mode}")
+
+    # construct 2 vertex list represent the match result
+    M_prin_eigenvector = prin_eigenvector.reshape(num_g1, num_g2)
+    i_g1_list, i_g2_list = discretize(M_prin_eigenvector, para)
 
     # construct 2 adjancency matrix that could calculate the error
-    assert len(i_g1_list) == len(i_g2_list)
     num_match = len(i_g1_list)
-    M_adj_g1_match = np.zeros((num_match, num_match))
-    M_adj_g2_match = np.zeros((num_match, num_match))
-    for i in range(num_match):
-        i_g1_s1 = i_g1_list[i]
-        i_g2_s1 = i_g2_list[i]
-        for j in range(i + 1, num_match):
-            i_g1_s2 = i_g1_list[j]
-            i_g2_s2 = i_g2_list[j]
-            M_adj_g1_match[i][j] = M_adj_g1[i_g1_s1][i_g1_s2]
-            M_adj_g1_match[j][i] = M_adj_g1_match[i][j]
-            M_adj_g2_match[i][j] = M_adj_g2[i_g2_s1][i_g2_s2]
-            M_adj_g2_match[j][i] = M_adj_g2_match[i][j]
+    M_adj_g1_match = M_adj_g1[np.ix_(i_g1_list, i_g1_list)]
+    M_adj_g2_match = M_adj_g2[np.ix_(i_g2_list, i_g2_list)]
 
     # use the default norm(F norm) to represent the error
     error = np.linalg.norm(M_adj_g1_match - M_adj_g2_match) / num_match
     return error
+
+
+# match 1 graph with a list of candidate graphs & calculate the errors after match
+# input:
+# the adjacency matrix of the query graph
+# the list of adjacency matrixes of the candidate graphs
+# output:
+# the match errors, one for each candidate graph
+# para.match_batch:
+# False: every candidate is matched by match_graph
+# True: the candidates of the same number of vertex are matched together, see
+# _match_graph_batch. The candidates that need the implicit affinity mode or the
+# 'eig' mode are still matched by match_graph. A batch never costs more memory
+# than para.affi_max_bytes.
+def match_graph_batch(M_adj_g1, M_adj_g2_list, para):
+    num_g1, _ = M_adj_g1.shape
+    errors = np.empty(len(M_adj_g2_list))
+    match_batch = para.get("match_batch", False)
+    eig_mode = para.get("eig_mode", "eig")
+
+    # group the candidates by the number of vertex
+    i_cand_dict = {}
+    for i_cand, M_adj_g2 in enumerate(M_adj_g2_list):
+        num_g2, _ = M_adj_g2.shape
+        if (
+            match_batch
+            and eig_mode != "eig"
+            and select_affi_mode(num_g1, num_g2, para) == "dense"
+        ):
+            i_cand_dict.setdefault(num_g2, []).append(i_cand)
+        else:
+            errors[i_cand] = match_graph(M_adj_g1, M_adj_g2, para)
+
+    match_batch_size = para.get("match_batch_size", 16)
+    affi_max_bytes = para.get("affi_max_bytes", 256 * 2**20)
+    for num_g2, i_cand_list in i_cand_dict.items():
+        affi_bytes = 8 * (num_g1 * num_g2) ** 2
+        batch_size = min(match_batch_size, max(1, affi_max_bytes // affi_bytes))
+        for i_batch in range(0, len(i_cand_list), batch_size):
+            i_cand_batch = i_cand_list[i_batch : i_batch + batch_size]
+            M_adj_g2_batch = np.stack([M_adj_g2_list[i] for i in i_cand_batch])
+            errors[i_cand_batch] = _match_graph_batch(M_adj_g1, M_adj_g2_batch, para)
+    return errors
+
+
+# construct the affinity matrixes of 1 graph & a batch of graphs, see
+# gen_affinity_matrix
+# input:
+# the adjacency matrix of the query graph
+# the adjacency matrixes of the candidate graphs, (num_batch, num_g2, num_g2)
+# output:
+# the affinity matrixes, (num_batch, num_g1 * num_g2, num_g1 * num_g2)
+def gen_affinity_matrix_batch(M_adj_g1, M_adj_g2_batch, para):
+    num_batch, num_g2, _ = M_adj_g2_batch.shape
+    num_g1, _ = M_adj_g1.shape
+
+    # axes: i_batch, i_g1_s1, i_g2_s1, i_g1_s2, i_g2_s2
+    # the operations are done in place, so only 1 array of the size is kept.
+    M_affi = np.subtract(
+        M_adj_g1[None, :, None, :, None], M_adj_g2_batch[:, None, :, None, :]
+    )
+    np.abs(M_affi, out=M_affi)
+    M_affi *= para.times_sub_AD
+    np.exp(M_affi, out=M_affi)
+    np.reciprocal(M_affi, out=M_affi)
+
+    # if there is a vertex, the element of the M_affi should be 0.
+    same_g1 = np.eye(num_g1, dtype=bool)[:, None, :, None]
+    same_g2 = np.eye(num_g2, dtype=bool)[None, :, None, :]
+    M_affi[:, same_g1 | same_g2] = 0
+    return M_affi.reshape(num_batch, num_g1 * num_g2, num_g1 * num_g2)
+
+
+# match 1 graph with a batch of candidate graphs of the same number of vertex
+# input:
+# the adjacency matrix of the query graph
+# the adjacency matrixes of the candidate graphs, (num_batch, num_g2, num_g2)
+# output:
+# the match errors, the same as match_graph in the dense affinity mode
+def _match_graph_batch(M_adj_g1, M_adj_g2_batch, para):
+    num_batch, num_g2, _ = M_adj_g2_batch.shape
+    num_g1, _ = M_adj_g1.shape
+    num_pair = num_g1 * num_g2
+
+    # construct the affinity matrixes
+    M_affi = gen_affinity_matrix_batch(M_adj_g1, M_adj_g2_batch, para)
+
+    # find the principal eigenvectors, see select_eig_mode
+    eig_mode = select_eig_mode(num_g1, num_g2, para)
+    if eig_mode not in ("eigh", "power"):
+        raise ValueError(f"Unknown eig_mode of a batch: {eig_mode}")
+    if eig_mode == "power":
+        prin_eigenvector, converged = power_iteration_batch(M_affi, para)
+    else:
+        prin_eigenvector = np.empty((num_batch, num_pair))
+        converged = np.zeros(num_batch, dtype=bool)
+    # eigh is also the fallback of the candidates whose power iteration does not
+    # converge
+    if not converged.all():
+        prin_eigenvector_eigh = find_prin_eigenvector_eigh(M_affi[~converged])
+        # make sure all the elements of the prin_eigenvector are positive
+        sign = np.where(prin_eigenvector_eigh.sum(axis=1, keepdims=True) < 0, -1, 1)
+        prin_eigenvector[~converged] = prin_eigenvector_eigh * sign
+
+    # discretize the principal eigenvectors, see discretize
+    prin_eigenvector = prin_eigenvector.reshape(num_batch, num_g1, num_g2)
+    num_match = min(num_g1, num_g2)
+    i_g1_match = np.zeros((num_batch, num_match), dtype=int)
+    i_g2_match = np.zeros((num_batch, num_match), dtype=int)
+    i_batch = np.arange(num_batch)
+    discrete_mode = para.get("discrete_mode", "greedy")
+    if discrete_mode == "greedy":
+        # all the candidates are discretized together
+        for i_match in range(num_match):
+            i_max_elem = np.argmax(prin_eigenvector.reshape(num_batch, -1), axis=1)
+            i_g1_max, i_g2_max = np.divmod(i_max_elem, num_g2)
+            i_g1_match[:, i_match] = i_g1_max
+            i_g2_match[:, i_match] = i_g2_max
+            prin_eigenvector[i_batch, i_g1_max, :] = -float("inf")
+            prin_eigenvector[i_batch, :, i_g2_max] = -float("inf")
+    else:
+        for i_cand in range(num_batch):
+            i_g1_match[i_cand], i_g2_match[i_cand] = discretize(
+                prin_eigenvector[i_cand], para
+            )
+
+    # use the default norm(F norm) to represent the error
+    M_adj_g1_match = M_adj_g1[i_g1_match[:, :, None], i_g1_match[:, None, :]]
+    M_adj_g2_match = M_adj_g2_batch[
+        i_batch[:, None, None], i_g2_match[:, :, None], i_g2_match[:, None, :]
+    ]
+    sub_AD_match = M_adj_g1_match - M_adj_g2_match
+    errors = np.sqrt(np.sum(sub_AD_match**2, axis=(1, 2))) / num_match
+    return errors
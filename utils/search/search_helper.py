@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+This code is used to search the database graph that matches the test graph,
+through an expanding window of the AD sum in mst.
+
+The window [AD_sum_mst - epsilon_AD, AD_sum_mst + epsilon_AD] is found by the
+k-vector rough search. Every time the window is widened, only the newly exposed
+candidates are matched, from the candidate whose AD sum is the closest to the
+test graph. The best match is kept across the windows, so the search is done
+as soon as a candidate whose error is smaller than epsilon_error is found.
+
+Written in 2026.10.18
+"""
+
+
+import heapq
+import numpy as np
+
+from utils.common.profile_helper import null_profiler
+from utils.search.k_vector_helper import search_k_vector
+from utils.search.match_helper import match_graph_batch
+
+
+# CN: CatalogNumber
+# AD: angular distance
+# mst: minimum spanning tree
+# _ms: main star
+
+
+# generate the widths of the expanding window
+# input:
+# the minimum & the maximum width of the window
+# output:
+# the widths, which are doubled every time until the maximum width
+def gen_epsilon_AD_list(epsilon_AD_min, epsilon_AD_max):
+    epsilon_AD_list = []
+    epsilon_AD = epsilon_AD_min
+    while epsilon_AD < epsilon_AD_max:
+        epsilon_AD_list.append(epsilon_AD)
+        epsilon_AD *= 2
+    epsilon_AD_list.append(epsilon_AD_max)
+    return epsilon_AD_list
+
+
+# search the database graph that matches the test graph
+# input:
+# the test graph, whose AD_sum_mst has been calculated
+# the GraphDatabase, see utils.database.database_helper
+# the Profiler of the query, see utils.common.profile_helper
+# output:
+# the index of the best matched graph in the database (None if no candidate)
+# the match error of the best matched graph
+# If the profiler is enabled, the para.num_top best matches are noted as
+# 'top_candidates', [[CN_ms, error], ...] in the ascending order of the error.
+def search_graph(graph, database, para, profiler=null_profiler):
+    k_vector, q, m = database.k_vector_q_m
+    # the best matches are only kept for the profile
+    num_top = para.get("num_top", 5) if profiler.enabled else 0
+    match_batch_size = para.get("match_batch_size", 16)
+
+    AD_sum_mst = graph["AD_sum_mst"]
+    M_adj_g1 = graph["M_adj"]
+    num_star1 = M_adj_g1.shape[0]
+
+    # the best matches so far, a heap of (-error, -i_graph)
+    top_list = []
+    i_target = None
+    min_error = float("inf")
+
+    i_interval_start = None
+    i_interval_end = None
+    for epsilon_AD in para.epsilon_AD_list:
+        profiler.count("epsilon_step")
+        with profiler.stage("search_k_vector"):
+            i_start, i_end = search_k_vector(AD_sum_mst, k_vector, q, m, epsilon_AD)
+        # only the newly exposed candidates are matched
+        if i_interval_start is None:
+            i_graph_list = np.arange(i_start, i_end + 1)
+        else:
+            i_graph_list = np.concatenate(
+                [
+                    np.arange(i_start, i_interval_start),
+                    np.arange(i_interval_end + 1, i_end + 1),
+                ]
+            )
+        i_interval_start, i_interval_end = i_start, i_end
+
+        # the candidates whose number of stars differs too much are skipped
+        num_star2 = database.num_star[i_graph_list]
+        i_graph_match = i_graph_list[
+            np.abs(num_star1 - num_star2) <= (0.2 * num_star2).astype(int)
+        ]
+        # match the candidates from the closest AD sum
+        sub_AD_sum = np.abs(database.AD_sum_mst[i_graph_match] - AD_sum_mst)
+        i_graph_match = i_graph_match[np.argsort(sub_AD_sum, kind="stable")].tolist()
+        profiler.count("num_candidate", len(i_graph_list))
+        profiler.count("num_candidate_filtered", len(i_graph_match))
+
+        for i_batch in range(0, len(i_graph_match), match_batch_size):
+            i_graph_batch = i_graph_match[i_batch : i_batch + match_batch_size]
+            with profiler.stage("get_M_adj"):
+                M_adj_g2_list = [
+                    database.get_M_adj(i_graph) for i_graph in i_graph_batch
+                ]
+            with profiler.stage("match_graph"):
+                errors = match_graph_batch(M_adj_g1, M_adj_g2_list, para)
+            profiler.count("num_match", len(i_graph_batch))
+
+            for i_graph, error in zip(i_graph_batch, errors):
+                if error < min_error:
+                    i_target = i_graph
+                    min_error = error
+                if num_top > 0:
+                    heapq.heappush(top_list, (-error, -i_graph))
+                    if len(top_list) > num_top:
+                        heapq.heappop(top_list)
+
+            # if the min_error is smaller than the epsilon_error, the search is done.
+            if min_error <= para.epsilon_error:
+                break
+        if min_error <= para.epsilon_error:
+            break
+
+    top_list = sorted((-error, -i_graph) for error, i_graph in top_list)
+    profiler.note(
+        "top_candidates",
+        [[int(database.CN_ms[i_graph]), float(error)] for error, i_graph in top_list],
+    )
+    return i_target, min_error
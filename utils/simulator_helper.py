@@ -1,12 +1,12 @@
 # -*- coding: utf-8 -*-
 """
-This code is used to generate simulation star images through RightAscension & 
+This code is used to generate simulation star images through RightAscension &
 Declination of the stars in FOV of CCD.
 
-The project model of one star is described in 'project_1s' function.
+The project model of the stars is described in 'project_stars' function.
 
-According to the project model, the main star is projected to the center of the 
-image. The neighbor star whose AD (angular distance) with main star is less than 
+According to the project model, the main star is projected to the center of the
+image. The neighbor star whose AD (angular distance) with main star is less than
 FOV_max is project in the image.
 
 written in 2020.04.13, revised in 2022.12.06
@@ -16,6 +16,8 @@ By Zhiyuan You
 import math
 import numpy as np
 
+from utils.common.star_frame_helper import gen_star_frame
+
 
 # CN: Catalog Number
 # VM: Visual Magnitude
@@ -35,84 +37,111 @@ deg2rad = math.pi / 180
 rad2deg = 180 / math.pi
 
 
-def simulate_one_star(lines, i_ms, para_simu):
-    num_star = len(lines)
-    lines_out = []
-
-    data_ms = lines[i_ms].strip().split()
-    assert len(data_ms) == 4
-
-    # generate unit vector for calculating angular distance
-    CN_ms, VM_ms, RA_ms, Dec_ms = data_ms
-    CN_ms, VM_ms, RA_ms, Dec_ms = int(CN_ms), float(VM_ms), float(RA_ms), float(Dec_ms)
-    vz_ms = np.sin(Dec_ms)
-    vx_ms = np.cos(RA_ms) * np.cos(Dec_ms)
-    vy_ms = np.sin(RA_ms) * np.cos(Dec_ms)
-
-    # write main star into txt file: CN VM x_pixel y_pixel
-    x_ms = y_ms = 0
-    lines_out.append(f"{CN_ms} {VM_ms} {x_ms} {y_ms} {RA_ms} {Dec_ms}\n")
-
-    for i_ns in range(num_star):
-        if i_ns == i_ms:
-            continue  # main star has been written.
-
-        data_ns = lines[i_ns].strip().split()
-        assert len(data_ns) == 4
-
-        # generate unit vector for calculating angular distance
-        CN_ns, VM_ns, RA_ns, Dec_ns = data_ns
-        CN_ns, VM_ns, RA_ns, Dec_ns = (
-            int(CN_ns),
-            float(VM_ns),
-            float(RA_ns),
-            float(Dec_ns),
-        )
-        vx_ns = np.cos(RA_ns) * np.cos(Dec_ns)
-        vy_ns = np.sin(RA_ns) * np.cos(Dec_ns)
-        vz_ns = np.sin(Dec_ns)
-
-        # AD_ms_ns: the angular distance between main star & neighbor star
-        # if there are some numerous errors, |cos| may slightly > 1
-        cos = vx_ns * vx_ms + vy_ns * vy_ms + vz_ns * vz_ms
-        AD_ms_ns = np.arccos(np.clip(cos, -1, 1)) * rad2deg
-
-        if AD_ms_ns < para_simu.FOV_max:
-            # x_ns, y_ns: the project coordinate of neighbor star
-            x_ns, y_ns = project_1s(
-                Dec_ms,
-                RA_ms,
-                Dec_ns,
-                RA_ns,
-                para_simu.N_x,
-                para_simu.N_y,
-                para_simu.FOV_x,
-                para_simu.FOV_y,
-            )
-            if abs(x_ns) > para_simu.N_x // 2 or abs(y_ns) > para_simu.N_y // 2:
-                # fall outside of the FOV
-                pass
-            else:
-                # write neighbor star into txt file: CN VM x_pixel y_pixel
-                lines_out.append(f"{CN_ns} {VM_ns} {x_ns} {y_ns} {RA_ns} {Dec_ns}\n")
-
-            # if the main star belogs to a double star system
-            if AD_ms_ns <= para_simu.AD_2s_thre:
-                return None
-
-    return lines_out
-
-
-# the project model of one star
-def project_1s(Dec, RA, Dec_i, RA_i, N_x, N_y, FOV_x, FOV_y):
-    # input:
-    # Dec,RA: the Dec & RA of the optical axis
-    # Dec_i,RA_i: the Dec & RA of the ith star
-    # N_x,N_y: the resolution of the picture
-    # FOV_x,FOV_y: the FOV of the CCD
+# load the star catalog sorted by VM, see utils/sao_helper.py
+# input:
+# the '.npz' file of the catalog
+# VM_thre: only the stars whose VM is less than VM_thre, None: all the stars
+# output:
+# the catalog dict of arrays, 'CN', 'VM', 'RA', 'Dec' & the unit vectors
+# 'v_inertial' with shape (num_star, 3)
+def load_catalog(f_catalog_name, VM_thre=None):
+    with np.load(f_catalog_name) as data:
+        catalog = {key: data[key] for key in data.files}
+    if VM_thre is not None:
+        catalog = select_VM(catalog, VM_thre)
+    return catalog
+
+
+def save_catalog(catalog, f_catalog_name):
+    np.savez(f_catalog_name, **catalog)
+
+
+# select the stars whose VM is less than VM_thre from the catalog sorted by VM,
+# which are the prefix of the catalog, so the arrays are views without copying
+def select_VM(catalog, VM_thre):
+    num_star = np.searchsorted(catalog["VM"], VM_thre, side="left")
+    return {key: catalog[key][:num_star] for key in catalog}
+
+
+# parse the lines of the stars, format: CN VM RA Dec
+def parse_catalog(lines):
+    data_s = [line.strip().split() for line in lines]
+    assert all(len(data) == 4 for data in data_s)
+
+    catalog = dict()
+    catalog["CN"] = np.array([int(data[0]) for data in data_s], dtype=int)
+    catalog["VM"] = np.array([float(data[1]) for data in data_s])
+    catalog["RA"] = np.array([float(data[2]) for data in data_s])
+    catalog["Dec"] = np.array([float(data[3]) for data in data_s])
+    catalog["v_inertial"] = gen_inertial_vector(catalog["RA"], catalog["Dec"])
+    return catalog
+
+
+# generate the unit vectors through RA & Dec, shape: (num_star, 3)
+def gen_inertial_vector(RA, Dec):
+    return np.stack(
+        [np.cos(RA) * np.cos(Dec), np.sin(RA) * np.cos(Dec), np.sin(Dec)], axis=-1
+    )
+
+
+# simulate the star image whose optical axis points to the main star
+# input:
+# the catalog dict, see load_catalog
+# the index of the main star in the catalog
+# the SkyIndex of the catalog, if None, the whole catalog is scanned
+# output:
+# the star frame of the stars in the image (see star_frame_helper), the main star
+# is the 0th star. None if the main star belongs to a double star system.
+def simulate_one_star(catalog, i_ms, para_simu, sky_index=None):
+    RA_ms = catalog["RA"][i_ms]
+    Dec_ms = catalog["Dec"][i_ms]
+    v_ms = catalog["v_inertial"][i_ms]
+
+    # the candidates of the neighbor stars
+    if sky_index is None:
+        i_ns_list = np.arange(len(catalog["CN"]))
+    else:
+        i_ns_list = sky_index.query(v_ms, para_simu.FOV_max)
+    # main star has been written.
+    i_ns_list = i_ns_list[i_ns_list != i_ms]
+
+    # AD_ms_ns: the angular distance between main star & neighbor star
+    # if there are some numerous errors, |cos| may slightly > 1
+    cos = np.matmul(catalog["v_inertial"][i_ns_list], v_ms)
+    AD_ms_ns = np.arccos(np.clip(cos, -1, 1)) * rad2deg
+    i_ns_list = i_ns_list[AD_ms_ns < para_simu.FOV_max]
+
+    # if the main star belogs to a double star system
+    if np.any(AD_ms_ns[AD_ms_ns < para_simu.FOV_max] <= para_simu.AD_2s_thre):
+        return None
+
+    # x_ns, y_ns: the project coordinate of neighbor star
+    x_ns, y_ns = project_stars(
+        Dec_ms,
+        RA_ms,
+        catalog["v_inertial"][i_ns_list],
+        para_simu.N_x,
+        para_simu.N_y,
+        para_simu.FOV_x,
+        para_simu.FOV_y,
+    )
+    # the stars fall outside of the FOV are removed
+    in_FOV = (np.abs(x_ns) <= para_simu.N_x // 2) & (np.abs(y_ns) <= para_simu.N_y // 2)
+
+    # the main star is at the center of the image
+    i_s_list = np.concatenate([[i_ms], i_ns_list[in_FOV]])
+    frame = gen_star_frame(len(i_s_list))
+    for name in ["CN", "VM", "RA", "Dec"]:
+        frame[name] = catalog[name][i_s_list]
+    frame["x"] = np.concatenate([[0], x_ns[in_FOV]])
+    frame["y"] = np.concatenate([[0], y_ns[in_FOV]])
+    return frame
+
+
+# the rotate matrix from the inertial space to the body space in CCD, whose
+# optical axis points to (Dec, RA)
+def gen_rotate_matrix(Dec, RA):
     # calculate the rotate matrix Rx by theta_x
-    # output:
-    # Xr,Yr: the pixel coordinate of the image
     theta_x = -(math.pi / 2 - Dec)
     Rx = [
         [1, 0, 0],
@@ -126,16 +155,22 @@ def project_1s(Dec, RA, Dec_i, RA_i, N_x, N_y, FOV_x, FOV_y):
         [-np.sin(theta_z), np.cos(theta_z), 0],
         [0, 0, 1],
     ]
-    R = np.matmul(Rx, Rz)
-    # calculate the inertial vector in inertial space
-    v_inertial = [
-        np.cos(RA_i) * np.cos(Dec_i),
-        np.sin(RA_i) * np.cos(Dec_i),
-        np.sin(Dec_i),
-    ]
+    return np.matmul(Rx, Rz)
+
+
+# the project model of many stars, all of which are rotated by one rotate matrix
+# input:
+# Dec,RA: the Dec & RA of the optical axis
+# v_inertial: the unit vectors of the stars, shape: (num_star, 3)
+# N_x,N_y: the resolution of the picture
+# FOV_x,FOV_y: the FOV of the CCD
+# output:
+# Xr,Yr: the arrays of the pixel coordinate of the image
+def project_stars(Dec, RA, v_inertial, N_x, N_y, FOV_x, FOV_y):
+    R = gen_rotate_matrix(Dec, RA)
     # transfer the inertial vector to body vector in CCD space
-    v_body = np.matmul(R, v_inertial)
+    v_body = np.matmul(v_inertial, R.T)
     # project to the pixel coordinate (the space origin is the center of the image)
-    Xr = -v_body[0] / v_body[2] * N_x / 2 / np.tan(FOV_x / 2 * deg2rad)
-    Yr = -v_body[1] / v_body[2] * N_y / 2 / np.tan(FOV_y / 2 * deg2rad)
+    Xr = -v_body[:, 0] / v_body[:, 2] * N_x / 2 / np.tan(FOV_x / 2 * deg2rad)
+    Yr = -v_body[:, 1] / v_body[:, 2] * N_y / 2 / np.tan(FOV_y / 2 * deg2rad)
     return Xr, Yr
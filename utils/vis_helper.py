@@ -1,12 +1,12 @@
 # -*- coding: utf-8 -*-
 """
-This code is used to generate simulation star images through RightAscension & 
+This code is used to generate simulation star images through RightAscension &
 Declination of the stars in FOV of CCD.
 
-The project model of one star is described in 'project_1s' function.
+The project model of the stars is described in 'project_stars' function.
 
-According to the project model, the main star is projected to the center of the 
-image. The neighbor star whose AD (angular distance) with main star is less than 
+According to the project model, the main star is projected to the center of the
+image. The neighbor star whose AD (angular distance) with main star is less than
 FOV_max is project in the image.
 
 Written in 2020.04.13, revised in 2022.12.06
@@ -31,22 +31,14 @@ import numpy as np
 # _2s: double star
 
 
-def vis_lines(lines, para):
-    num_star = len(lines)
+# draw the stars of a star frame, see star_frame_helper
+def vis_frame(frame, para):
     img = np.zeros((para.N_y, para.N_x, 3), np.uint8)
 
-    data_ms = lines[0].strip().split()
-    assert len(data_ms) == 6
-    _, VM_ms, x_ms, y_ms, _, _ = data_ms
-    VM_ms, x_ms, y_ms = float(VM_ms), float(x_ms), float(y_ms)
-    vis_a_star(x_ms, y_ms, VM_ms, img, para)
-
-    for i_ns in range(1, num_star):
-        data_ns = lines[i_ns].strip().split()
-        assert len(data_ns) == 6
-        _, VM_ns, x_ns, y_ns, _, _ = data_ns
-        VM_ns, x_ns, y_ns = float(VM_ns), float(x_ns), float(y_ns)
-        vis_a_star(x_ns, y_ns, VM_ns, img, para)
+    for x_s, y_s, VM_s in zip(
+        frame["x"].tolist(), frame["y"].tolist(), frame["VM"].tolist()
+    ):
+        vis_a_star(x_s, y_s, VM_s, img, para)
 
     return img
 
@@ -61,9 +53,10 @@ def vis_a_star(x, y, VM, img, para):
     cv2.circle(img, (x_pixel, y_pixel), R, para.Color, -1)
 
 
-def vis_graph(CN_list, XY_list, para):
-    assert len(CN_list) == len(XY_list)
-    num_star = len(CN_list)
+def vis_graph(frame, para):
+    num_star = len(frame)
+    CN_list = frame["CN"].tolist()
+    XY_list = list(zip(frame["x"].tolist(), frame["y"].tolist()))
 
     img = np.ones((para.N_y, para.N_x, 3), np.uint8) * 255
 
@@ -101,7 +94,8 @@ def vis_graph(CN_list, XY_list, para):
     return img
 
 
-def vis_mst(mst, XY_list, para):
+def vis_mst(mst, frame, para):
+    XY_list = list(zip(frame["x"].tolist(), frame["y"].tolist()))
     img = (
         np.ones((para.N_y, para.N_x, 3), np.uint8) * 255
     )  # in numpy:(height,width), so:(N_y,N_x)